@@ -1,33 +1,53 @@
-from app import app, get_db_connection, admin_required
-from flask import render_template, request, jsonify, session, redirect, url_for, flash
-import sqlite3
-
-def admin_required(f):
-    from functools import wraps
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if not session.get('is_admin'):
-            flash('Admin access required', 'error')
-            return redirect(url_for('admin_login'))
-        return f(*args, **kwargs)
-    return decorated_function
-
-# Admin Dashboard
-@app.route('/admin/dashboard')
+"""Admin pages (/admin): dashboard, catalog, users, orders, reports and diagnostics.
+
+The admin login and logout pages live in auth.py; everything here requires
+an admin session (auth.admin_required).
+"""
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
+
+import analytics
+import jobs
+import metrics
+import slowlog
+from auth import admin_required
+from cache import catalog_version
+from catalog import set_stock
+from db import get_db
+from orders import OrderError, set_status
+from writer import write
+
+bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+def insert_book(conn, fields, stock):
+    """Add a book with `stock` copies available; a write, see writer.py"""
+    book_id = conn.execute('''
+        INSERT INTO books (title, author, description, price, genre, cover_image, isbn, publisher, pages, is_featured)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', fields).lastrowid
+    set_stock(conn, book_id, stock)
+
+def update_book(conn, book_id, fields, stock):
+    """Save an edited book and its available stock; a write, see writer.py"""
+    conn.execute('''
+        UPDATE books SET title=?, author=?, description=?, price=?, genre=?, 
+        cover_image=?, isbn=?, publisher=?, pages=?, is_featured=?, is_active=?
+        WHERE id=?
+    ''', (*fields, book_id))
+    set_stock(conn, book_id, stock)
+
+
+@bp.route('/dashboard')
 @admin_required
 def admin_dashboard():
-    conn = get_db_connection()
-    
-    # Get dashboard stats
-    stats = {
-        'total_users': conn.execute('SELECT COUNT(*) FROM users WHERE is_admin = 0').fetchone()[0],
-        'total_books': conn.execute('SELECT COUNT(*) FROM books').fetchone()[0],
-        'total_orders': conn.execute('SELECT COUNT(*) FROM orders').fetchone()[0],
-        'total_revenue': conn.execute('SELECT SUM(total_amount) FROM orders WHERE status = "completed"').fetchone()[0] or 0,
-        'pending_orders': conn.execute('SELECT COUNT(*) FROM orders WHERE status = "pending"').fetchone()[0]
-    }
-    
-    # Recent orders
+    conn = get_db()
+    
+    # Maintained incrementally by triggers, see migrations/0004_store_stats.sql
+    stats = conn.execute('''
+        SELECT total_users, total_books, total_orders, total_revenue, pending_orders
+        FROM store_stats WHERE id = 1
+    ''').fetchone()
+    
     recent_orders = conn.execute('''
         SELECT o.*, u.username 
         FROM orders o 
@@ -36,32 +56,31 @@ def admin_dashboard():
         LIMIT 5
     ''').fetchall()
     
-    # Low stock books
     low_stock_books = conn.execute('''
-        SELECT * FROM books 
-        WHERE stock < 10 AND is_active = 1 
-        ORDER BY stock ASC 
+        SELECT b.*, i.on_hand - i.reserved AS stock
+        FROM inventory i JOIN books b ON b.id = i.book_id
+        WHERE i.on_hand - i.reserved < 10 AND b.is_active = 1 
+        ORDER BY i.on_hand - i.reserved ASC 
         LIMIT 5
     ''').fetchall()
     
-    conn.close()
-    
     return render_template('admin/dashboard.html', 
                          stats=stats, 
                          recent_orders=recent_orders,
                          low_stock_books=low_stock_books)
 
-# Manage Books
-@app.route('/admin/books')
+@bp.route('/books')
 @admin_required
 def admin_books():
-    conn = get_db_connection()
-    books = conn.execute('SELECT * FROM books ORDER BY created_at DESC').fetchall()
-    conn.close()
+    conn = get_db()
+    books = conn.execute('''
+        SELECT b.*, i.on_hand - i.reserved AS stock
+        FROM books b JOIN inventory i ON i.book_id = b.id
+        ORDER BY b.created_at DESC
+    ''').fetchall()
     return render_template('admin/books.html', books=books)
 
-# Add New Book
-@app.route('/admin/books/add', methods=['GET', 'POST'])
+@bp.route('/books/add', methods=['GET', 'POST'])
 @admin_required
 def add_book():
     if request.method == 'POST':
@@ -74,27 +93,22 @@ def add_book():
         cover_image = request.form['cover_image']
         isbn = request.form['isbn']
         publisher = request.form['publisher']
-        pages = int(request.form['pages'])
+        pages = int(request.form['pages']) if request.form['pages'] else 0
         is_featured = 1 if request.form.get('is_featured') else 0
         
-        conn = get_db_connection()
-        conn.execute('''
-            INSERT INTO books (title, author, description, price, genre, stock, cover_image, isbn, publisher, pages, is_featured)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (title, author, description, price, genre, stock, cover_image, isbn, publisher, pages, is_featured))
-        conn.commit()
-        conn.close()
+        write(insert_book, (title, author, description, price, genre, cover_image, isbn, publisher, pages, is_featured),
+              stock)
+        catalog_version.invalidate()
         
         flash('Book added successfully', 'success')
-        return redirect(url_for('admin_books'))
+        return redirect(url_for('admin.admin_books'))
     
     return render_template('admin/add_book.html')
 
-# Edit Book
-@app.route('/admin/books/edit/<int:book_id>', methods=['GET', 'POST'])
+@bp.route('/books/edit/<int:book_id>', methods=['GET', 'POST'])
 @admin_required
 def edit_book(book_id):
-    conn = get_db_connection()
+    conn = get_db()
     
     if request.method == 'POST':
         title = request.form['title']
@@ -106,46 +120,43 @@ def edit_book(book_id):
         cover_image = request.form['cover_image']
         isbn = request.form['isbn']
         publisher = request.form['publisher']
-        pages = int(request.form['pages'])
+        pages = int(request.form['pages']) if request.form['pages'] else 0
         is_featured = 1 if request.form.get('is_featured') else 0
         is_active = 1 if request.form.get('is_active') else 0
         
-        conn.execute('''
-            UPDATE books SET title=?, author=?, description=?, price=?, genre=?, stock=?, 
-            cover_image=?, isbn=?, publisher=?, pages=?, is_featured=?, is_active=?
-            WHERE id=?
-        ''', (title, author, description, price, genre, stock, cover_image, isbn, publisher, pages, is_featured, is_active, book_id))
-        conn.commit()
-        conn.close()
+        write(update_book, book_id,
+              (title, author, description, price, genre, cover_image, isbn, publisher, pages, is_featured, is_active),
+              stock)
+        catalog_version.invalidate()
         
         flash('Book updated successfully', 'success')
-        return redirect(url_for('admin_books'))
+        return redirect(url_for('admin.admin_books'))
     
-    book = conn.execute('SELECT * FROM books WHERE id = ?', (book_id,)).fetchone()
-    conn.close()
+    book = conn.execute('''
+        SELECT b.*, i.on_hand - i.reserved AS stock, i.reserved
+        FROM books b JOIN inventory i ON i.book_id = b.id
+        WHERE b.id = ?
+    ''', (book_id,)).fetchone()
     
     if not book:
         flash('Book not found', 'error')
-        return redirect(url_for('admin_books'))
+        return redirect(url_for('admin.admin_books'))
     
     return render_template('admin/edit_book.html', book=book)
 
-# Manage Users
-@app.route('/admin/users')
+@bp.route('/users')
 @admin_required
 def admin_users():
-    conn = get_db_connection()
+    conn = get_db()
     users = conn.execute('SELECT * FROM users ORDER BY created_at DESC').fetchall()
-    conn.close()
     return render_template('admin/users.html', users=users)
 
-# Manage Orders
-@app.route('/admin/orders')
+@bp.route('/orders')
 @admin_required
 def admin_orders():
     status_filter = request.args.get('status', 'all')
     
-    conn = get_db_connection()
+    conn = get_db()
     
     if status_filter == 'all':
         orders = conn.execute('''
@@ -163,20 +174,60 @@ def admin_orders():
             ORDER BY o.created_at DESC
         ''', (status_filter,)).fetchall()
     
-    conn.close()
-    
     return render_template('admin/orders.html', orders=orders, status_filter=status_filter)
 
-# Update Order Status
-@app.route('/admin/orders/update_status/<int:order_id>', methods=['POST'])
+@bp.route('/orders/update_status/<int:order_id>', methods=['POST'])
 @admin_required
 def update_order_status(order_id):
     new_status = request.form['status']
     
-    conn = get_db_connection()
-    conn.execute('UPDATE orders SET status = ? WHERE id = ?', (new_status, order_id))
-    conn.commit()
-    conn.close()
+    try:
+        write(set_status, order_id, new_status)
+    except OrderError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin.admin_orders'))
+    jobs.wake()
     
     flash('Order status updated successfully', 'success')
-    return redirect(url_for('admin_orders'))    
\ No newline at end of file
+    return redirect(url_for('admin.admin_orders'))
+
+@bp.route('/reports')
+@admin_required
+def admin_reports():
+    try:
+        start, end = analytics.parse_range(request.args.get('start'), request.args.get('end'))
+    except ValueError:
+        flash('Invalid date range, showing the last 30 days', 'error')
+        start, end = analytics.parse_range()
+    
+    report = analytics.sales_report(get_db(), start, end)
+    return render_template('admin/reports.html', report=report)
+
+@bp.route('/reports.json')
+@admin_required
+def admin_reports_json():
+    try:
+        start, end = analytics.parse_range(request.args.get('start'), request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    
+    return jsonify(analytics.sales_report(get_db(), start, end))
+
+@bp.route('/metrics')
+@admin_required
+def admin_metrics():
+    return metrics.render(), 200, {'Content-Type': metrics.CONTENT_TYPE}
+
+@bp.route('/slow-queries')
+@admin_required
+def admin_slow_queries():
+    return render_template('admin/slow_queries.html',
+                           entries=slowlog.slow_query_log.entries(),
+                           threshold_ms=current_app.config['SLOW_QUERY_MS'])
+
+@bp.route('/slow-queries/clear', methods=['POST'])
+@admin_required
+def clear_slow_queries():
+    slowlog.slow_query_log.clear()
+    flash('Slow query log cleared', 'success')
+    return redirect(url_for('admin.admin_slow_queries'))
@@ -0,0 +1,136 @@
+"""Sales analytics backed by daily rollup tables.
+
+sales_daily, sales_daily_genre and sales_daily_book are maintained by
+triggers as orders enter or leave the 'completed' status (see
+migrations/0005_sales_rollups.sql), so reports read a few rows per day
+instead of joining orders, order_items and books.
+
+Usage:
+    python analytics.py rebuild [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+"""
+import argparse
+import os
+from datetime import date, timedelta
+
+import db
+
+DEFAULT_REPORT_DAYS = 30
+TOP_BOOKS_LIMIT = 10
+
+ROLLUP_TABLES = ('sales_daily', 'sales_daily_genre', 'sales_daily_book')
+
+_REBUILD_SQL = {
+    'sales_daily': '''
+        INSERT INTO sales_daily (day, orders, units, revenue)
+        SELECT date(o.created_at), COUNT(DISTINCT o.id), SUM(oi.quantity), SUM(oi.quantity * oi.price)
+        FROM orders o JOIN order_items oi ON oi.order_id = o.id
+        WHERE o.status = 'completed' AND date(o.created_at) BETWEEN ? AND ?
+        GROUP BY date(o.created_at)
+    ''',
+    'sales_daily_genre': '''
+        INSERT INTO sales_daily_genre (day, genre, orders, units, revenue)
+        SELECT date(o.created_at), b.genre, COUNT(DISTINCT o.id), SUM(oi.quantity), SUM(oi.quantity * oi.price)
+        FROM orders o JOIN order_items oi ON oi.order_id = o.id JOIN books b ON b.id = oi.book_id
+        WHERE o.status = 'completed' AND date(o.created_at) BETWEEN ? AND ?
+        GROUP BY date(o.created_at), b.genre
+    ''',
+    'sales_daily_book': '''
+        INSERT INTO sales_daily_book (day, book_id, genre, orders, units, revenue)
+        SELECT date(o.created_at), oi.book_id, b.genre, COUNT(DISTINCT o.id), SUM(oi.quantity), SUM(oi.quantity * oi.price)
+        FROM orders o JOIN order_items oi ON oi.order_id = o.id JOIN books b ON b.id = oi.book_id
+        WHERE o.status = 'completed' AND date(o.created_at) BETWEEN ? AND ?
+        GROUP BY date(o.created_at), oi.book_id
+    ''',
+}
+
+
+def parse_range(start=None, end=None, default_days=DEFAULT_REPORT_DAYS):
+    """Return (start, end) ISO dates, defaulting to the last `default_days` days.
+
+    Raises ValueError for malformed dates.
+    """
+    end_date = date.fromisoformat(end) if end else date.today()
+    start_date = date.fromisoformat(start) if start else end_date - timedelta(days=default_days - 1)
+    if start_date > end_date:
+        start_date, end_date = end_date, start_date
+    return start_date.isoformat(), end_date.isoformat()
+
+
+def rebuild(conn, start='0000-01-01', end='9999-12-31'):
+    """Recompute the rollups for an inclusive day range from the order tables"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for table in ROLLUP_TABLES:
+            conn.execute(f'DELETE FROM {table} WHERE day BETWEEN ? AND ?', (start, end))
+            conn.execute(_REBUILD_SQL[table], (start, end))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def sales_report(conn, start, end, top_books=TOP_BOOKS_LIMIT):
+    """Revenue, units and orders for an inclusive day range"""
+    totals = conn.execute('''
+        SELECT COALESCE(SUM(orders), 0) AS orders,
+               COALESCE(SUM(units), 0) AS units,
+               COALESCE(SUM(revenue), 0) AS revenue
+        FROM sales_daily WHERE day BETWEEN ? AND ?
+    ''', (start, end)).fetchone()
+
+    by_day = conn.execute('''
+        SELECT day, orders, units, revenue FROM sales_daily
+        WHERE day BETWEEN ? AND ? AND orders > 0
+        ORDER BY day
+    ''', (start, end)).fetchall()
+
+    by_genre = conn.execute('''
+        SELECT genre, SUM(orders) AS orders, SUM(units) AS units, SUM(revenue) AS revenue
+        FROM sales_daily_genre
+        WHERE day BETWEEN ? AND ?
+        GROUP BY genre
+        HAVING SUM(units) > 0
+        ORDER BY revenue DESC
+    ''', (start, end)).fetchall()
+
+    by_book = conn.execute('''
+        SELECT s.book_id, b.title, b.author, s.genre,
+               SUM(s.orders) AS orders, SUM(s.units) AS units, SUM(s.revenue) AS revenue
+        FROM sales_daily_book s
+        LEFT JOIN books b ON b.id = s.book_id
+        WHERE s.day BETWEEN ? AND ?
+        GROUP BY s.book_id
+        HAVING SUM(s.units) > 0
+        ORDER BY revenue DESC
+        LIMIT ?
+    ''', (start, end, top_books)).fetchall()
+
+    return {
+        'start': start,
+        'end': end,
+        'totals': dict(totals),
+        'by_day': [dict(row) for row in by_day],
+        'by_genre': [dict(row) for row in by_genre],
+        'top_books': [dict(row) for row in by_book],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bookstore sales analytics')
+    parser.add_argument('command', choices=['rebuild'])
+    parser.add_argument('--start', help='first day to rebuild (YYYY-MM-DD), default: all history')
+    parser.add_argument('--end', help='last day to rebuild (YYYY-MM-DD), default: all history')
+    parser.add_argument('--database', default=os.environ.get('BOOKSTORE_DATABASE', db.DEFAULT_DATABASE))
+    args = parser.parse_args(argv)
+
+    conn = db.connect(args.database)
+    try:
+        rebuild(conn, args.start or '0000-01-01', args.end or '9999-12-31')
+        days = conn.execute('SELECT COUNT(*) FROM sales_daily').fetchone()[0]
+        print(f"Rebuilt sales rollups ({days} days with sales)")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
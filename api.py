@@ -0,0 +1,271 @@
+"""JSON API (/api/v1): the catalog, read-only, and the logged-in user's cart.
+
+List endpoints use the same keyset cursors as the HTML pages: follow
+`pagination.next` / `pagination.prev` rather than building offsets. Every
+endpoint accepts `fields=title,price,...` to return only those fields.
+/api/v1/books/export.ndjson streams the whole active catalog one JSON object
+per line, read from the database in batches so memory use stays flat.
+
+Cart endpoints use the storefront session and answer every change with the
+new cart summary, so a page can update in place after one request.
+/api/v1/cart/batch applies several changes atomically.
+"""
+import json
+from functools import wraps
+
+from flask import Blueprint, Response, jsonify, request, session, stream_with_context, url_for
+
+import carts
+from cache import cached_count
+from conditional import conditional
+from db import get_db
+from pagination import fetch_page, page_size
+from search import HIGHLIGHT_END, HIGHLIGHT_START, search_books
+from writer import write
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Public book fields, in output order. Selected explicitly so internal
+# columns never leak and `fields=` can narrow the SQL itself.
+BOOK_FIELDS = (
+    'id', 'title', 'author', 'description', 'price', 'genre', 'cover_image',
+    'isbn', 'publisher', 'pages', 'is_featured', 'stock', 'created_at', 'updated_at',
+)
+EXPORT_BATCH_SIZE = 500
+
+
+def parse_fields(value):
+    """Return the requested book fields in output order; raise ValueError for unknown names"""
+    if not value:
+        return BOOK_FIELDS
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested.difference(BOOK_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return tuple(name for name in BOOK_FIELDS if name in requested)
+
+
+# Fields that are not columns of books
+FIELD_SQL = {
+    'stock': '(SELECT on_hand - reserved FROM inventory WHERE book_id = books.id) AS stock',
+}
+
+
+def select_list(fields):
+    # Cursor keys (title, id) are always selected, then dropped by serialize()
+    columns = dict.fromkeys(('id', 'title', *fields))
+    return ', '.join(FIELD_SQL.get(name, name) for name in columns)
+
+
+def serialize(row, fields):
+    book = {name: row[name] for name in fields}
+    if 'is_featured' in book:
+        book['is_featured'] = bool(book['is_featured'])
+    return book
+
+
+def error(message, status):
+    return jsonify({'error': message}), status
+
+
+def catalog_validators(*args, **kwargs):
+    state = get_db().execute('SELECT version, stock_version FROM catalog_state WHERE id = 1').fetchone()
+    return tuple(state), None
+
+
+def page_response(page, data, endpoint):
+    args = {key: value for key, value in request.args.items() if key not in ('after', 'before')}
+    return jsonify({
+        'data': data,
+        'pagination': {
+            'total': page.total,
+            'per_page': page.per_page,
+            'next': url_for(endpoint, after=page.next_cursor, **args) if page.next_cursor else None,
+            'prev': url_for(endpoint, before=page.prev_cursor, **args) if page.prev_cursor else None,
+        },
+    })
+
+
+@bp.route('/books')
+@conditional(catalog_validators)
+def books():
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return error(str(e), 400)
+
+    conn = get_db()
+    genre = request.args.get('genre')
+    per_page = page_size(request.args.get('per_page'))
+    if genre:
+        where, params = 'genre = ? AND is_active = 1', [genre]
+    else:
+        where, params = 'is_active = 1', []
+
+    total = cached_count(conn, ('genre', genre) if genre else ('search', None),
+                         f'SELECT COUNT(*) FROM books WHERE {where}', params)
+    page = fetch_page(conn, f'''
+        SELECT {select_list(fields)} FROM books
+        WHERE {where} AND {{keyset}}
+        ORDER BY {{order}}
+        LIMIT ?
+    ''', params, [('title', 'title'), ('id', 'id')],
+        request.args.get('after'), request.args.get('before'), per_page, total)
+
+    return page_response(page, [serialize(row, fields) for row in page.items], 'api.books')
+
+
+@bp.route('/books/<int:book_id>')
+@conditional(catalog_validators)
+def book(book_id):
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return error(str(e), 400)
+
+    row = get_db().execute(
+        f'SELECT {select_list(fields)} FROM books WHERE id = ? AND is_active = 1', (book_id,)
+    ).fetchone()
+    if row is None:
+        return error('Book not found', 404)
+    return jsonify({'data': serialize(row, fields)})
+
+
+@bp.route('/genres')
+@conditional(catalog_validators)
+def genres():
+    rows = get_db().execute('''
+        SELECT genre, COUNT(*) AS book_count FROM books
+        WHERE is_active = 1
+        GROUP BY genre
+        ORDER BY genre
+    ''').fetchall()
+    return jsonify({'data': [{'genre': row['genre'], 'book_count': row['book_count']} for row in rows]})
+
+
+@bp.route('/search')
+@conditional(catalog_validators)
+def search():
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return error(str(e), 400)
+
+    page = search_books(get_db(), request.args.get('q', '').strip(),
+                        request.args.get('after'), request.args.get('before'),
+                        page_size(request.args.get('per_page')))
+
+    data = []
+    for row in page.items:
+        item = serialize(row, fields)
+        # FTS snippet of the description, as plain text
+        snippet = row['snippet'] or ''
+        item['snippet'] = snippet.replace(HIGHLIGHT_START, '').replace(HIGHLIGHT_END, '') or None
+        data.append(item)
+    return page_response(page, data, 'api.search')
+
+
+@bp.route('/books/export.ndjson')
+def export_books():
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return error(str(e), 400)
+
+    def generate():
+        cursor = get_db().execute(
+            f'SELECT {select_list(fields)} FROM books WHERE is_active = 1 ORDER BY id'
+        )
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            yield ''.join(json.dumps(serialize(row, fields), separators=(',', ':')) + '\n' for row in rows)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Content-Disposition': 'attachment; filename=books.ndjson'})
+
+
+# ==================== CART ====================
+
+def user_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session or session.get('user_type') != 'user':
+            return error('Login required', 401)
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def request_data():
+    """The JSON object or form fields sent, or None for a JSON body that is not an object"""
+    data = request.get_json(silent=True)
+    if data is None:
+        return request.form.to_dict()
+    return data if isinstance(data, dict) else None
+
+
+def apply_cart_changes(changes):
+    try:
+        write(carts.apply_changes, session['user_id'], changes)
+    except carts.BookNotFoundError as e:
+        return error(str(e), 404)
+    except carts.NotEnoughStockError as e:
+        return error(str(e), 409)
+    return jsonify({'data': carts.summary(get_db(), session['user_id'])})
+
+
+@bp.route('/cart')
+@user_required
+def cart():
+    return jsonify({'data': carts.summary(get_db(), session['user_id'])})
+
+
+@bp.route('/cart/items', methods=['POST'])
+@user_required
+def add_cart_item():
+    data = request_data()
+    if data is None:
+        return error('Expected a JSON object', 400)
+    try:
+        change = carts.parse_change({**data, 'op': 'add'})
+    except ValueError as e:
+        return error(str(e), 400)
+    return apply_cart_changes([change])
+
+
+@bp.route('/cart/items/<int:book_id>', methods=['PUT'])
+@user_required
+def set_cart_item(book_id):
+    data = request_data()
+    if data is None:
+        return error('Expected a JSON object', 400)
+    if 'quantity' not in data:
+        return error('quantity is required', 400)
+    try:
+        change = carts.parse_change({'op': 'set', 'book_id': book_id, 'quantity': data['quantity']})
+    except ValueError as e:
+        return error(str(e), 400)
+    return apply_cart_changes([change])
+
+
+@bp.route('/cart/items/<int:book_id>', methods=['DELETE'])
+@user_required
+def remove_cart_item(book_id):
+    return apply_cart_changes([('remove', book_id, 0)])
+
+
+@bp.route('/cart/batch', methods=['POST'])
+@user_required
+def batch_cart():
+    data = request.get_json(silent=True)
+    changes = data.get('changes') if isinstance(data, dict) else None
+    if not isinstance(changes, list) or not changes:
+        return error('Expected {"changes": [{"op": ..., "book_id": ..., "quantity": ...}, ...]}', 400)
+    if len(changes) > carts.MAX_BATCH:
+        return error(f'At most {carts.MAX_BATCH} changes per batch', 400)
+    try:
+        parsed = [carts.parse_change(change) for change in changes]
+    except ValueError as e:
+        return error(str(e), 400)
+    return apply_cart_changes(parsed)
@@ -0,0 +1,101 @@
+"""Fingerprinted static assets.
+
+build_assets.py writes content-hashed copies of our CSS/JS and the vendored
+third-party files to static/dist/, each with precompressed .gz/.br siblings,
+plus a manifest mapping source names to hashed names. This module loads that
+manifest, makes url_for('static', filename=...) in templates point at the
+hashed copy, and serves static/dist/ with the best precompressed variant the
+client accepts and a one-year immutable Cache-Control.
+
+Without a build (no manifest) everything falls back to the plain static
+files and, for vendored libraries, to their CDN URLs.
+"""
+import json
+import mimetypes
+import os
+
+from flask import abort, current_app, request, send_file, url_for
+from werkzeug.security import safe_join
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Precompressed variants in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Third-party assets vendored under static/vendor/ by build_assets.py,
+# keyed by the name templates use with vendor_url().
+VENDOR_ASSETS = {
+    'bootstrap.css': (
+        'vendor/bootstrap-5.1.3/css/bootstrap.min.css',
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css',
+    ),
+    'bootstrap.js': (
+        'vendor/bootstrap-5.1.3/js/bootstrap.bundle.min.js',
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js',
+    ),
+    'fontawesome.css': (
+        'vendor/fontawesome-6.0.0/css/all.min.css',
+        'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+    ),
+    'inter.css': (
+        'vendor/inter/inter.css',
+        'https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap',
+    ),
+}
+
+
+def load_manifest(static_folder):
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_app(app):
+    app.extensions['asset_manifest'] = load_manifest(app.static_folder)
+    app.add_url_rule(f'/static/{DIST_DIR}/<path:filename>', 'asset', serve_asset)
+    app.jinja_env.globals.update(url_for=asset_url_for, vendor_url=vendor_url)
+
+
+def asset_url_for(endpoint, **values):
+    """url_for() that swaps static files for their fingerprinted build output"""
+    if endpoint == 'static':
+        hashed = current_app.extensions['asset_manifest'].get(values.get('filename'))
+        if hashed:
+            values['filename'] = hashed
+            return url_for('asset', **values)
+    return url_for(endpoint, **values)
+
+
+def vendor_url(name):
+    """URL of a vendored library: the local fingerprinted copy once built, else the CDN"""
+    local, cdn = VENDOR_ASSETS[name]
+    hashed = current_app.extensions['asset_manifest'].get(local)
+    return url_for('asset', filename=hashed) if hashed else cdn
+
+
+def serve_asset(filename):
+    directory = os.path.join(current_app.static_folder, DIST_DIR)
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    accepted = request.accept_encodings
+    for encoding, suffix in ENCODINGS:
+        if accepted[encoding] and os.path.isfile(path + suffix):
+            # Named after the asset itself, not the .gz/.br file on disk
+            response = send_file(path + suffix, mimetype=mimetype, conditional=True,
+                                 download_name=os.path.basename(path))
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_file(path, mimetype=mimetype, conditional=True)
+
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
@@ -1,8 +1,96 @@
-from app import app, get_db_connection, hash_password
-from flask import render_template, request, redirect, url_for, session, flash
+"""Registration, login/logout and the decorators guarding user and admin pages.
 
-# User registration
-@app.route('/register', methods=['GET', 'POST'])
+Users and admins log in separately; an admin can switch the same session
+between user and admin mode.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from flask import Blueprint, flash, redirect, render_template, request, session, url_for
+
+from db import get_db
+from writer import write
+
+bp = Blueprint('auth', __name__)
+
+
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def create_user(conn, username, email, password_hash):
+    """Insert a user and return its id, or None if the username or email is taken (a write, see writer.py)"""
+    existing_user = conn.execute(
+        'SELECT id FROM users WHERE username = ? OR email = ?',
+        (username, email)
+    ).fetchone()
+    if existing_user:
+        return None
+    return conn.execute(
+        'INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)',
+        (username, email, password_hash)
+    ).lastrowid
+
+# Enhanced session management for simultaneous login
+def create_user_session(user, user_type='user'):
+    """Create a session with user type differentiation"""
+    # Don't clear session - allow multiple logins
+    session['user_id'] = user['id']
+    session['username'] = user['username']
+    session['is_admin'] = bool(user['is_admin'])
+    session['user_type'] = user_type
+    session['login_time'] = datetime.now().isoformat()
+    session.permanent = True
+
+def validate_session():
+    """Validate current session"""
+    if 'user_id' not in session:
+        return False
+    
+    if 'user_type' not in session:
+        session['user_type'] = 'admin' if session.get('is_admin') else 'user'
+    
+    return True
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not validate_session():
+            flash('Please login to access this page', 'error')
+            return redirect(url_for('auth.admin_login'))
+        
+        if not session.get('is_admin') or session.get('user_type') != 'admin':
+            flash('Admin access required. Please login as admin.', 'error')
+            return redirect(url_for('auth.admin_login'))
+        
+        return f(*args, **kwargs)
+    return decorated_function
+
+def user_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not validate_session():
+            flash('Please login to access this page', 'error')
+            return redirect(url_for('auth.login'))
+        
+        if session.get('user_type') != 'user':
+            flash('Please login as user to access store features', 'error')
+            return redirect(url_for('auth.login'))
+        
+        return f(*args, **kwargs)
+    return decorated_function
+
+def public_route(f):
+    """Routes that can be accessed by anyone (no login required)"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        return f(*args, **kwargs)
+    return decorated_function
+
+# ==================== ROUTES ====================
+
+@bp.route('/register', methods=['GET', 'POST'])
+@public_route
 def register():
     if request.method == 'POST':
         username = request.form['username']
@@ -14,97 +102,93 @@ def register():
             flash('Passwords do not match', 'error')
             return render_template('register.html')
         
-        conn = get_db_connection()
+        user_id = write(create_user, username, email, hash_password(password))
         
-        # Check if username or email already exists
-        existing_user = conn.execute(
-            'SELECT id FROM users WHERE username = ? OR email = ?', 
-            (username, email)
-        ).fetchone()
-        
-        if existing_user:
+        if user_id is None:
             flash('Username or email already exists', 'error')
-            conn.close()
             return render_template('register.html')
         
-        # Create new user
-        password_hash = hash_password(password)
-        conn.execute(
-            'INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)',
-            (username, email, password_hash)
-        )
-        conn.commit()
-        conn.close()
-        
         flash('Registration successful! Please login.', 'success')
-        return redirect(url_for('login'))
+        return redirect(url_for('auth.login'))
     
     return render_template('register.html')
 
-# User login
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
+@public_route
 def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
         
-        conn = get_db_connection()
+        conn = get_db()
         user = conn.execute(
-            'SELECT * FROM users WHERE username = ?', 
+            'SELECT * FROM users WHERE username = ? AND is_admin = 0', 
             (username,)
         ).fetchone()
-        conn.close()
         
         if user and user['password_hash'] == hash_password(password):
-            session['user_id'] = user['id']
-            session['username'] = user['username']
-            session['is_admin'] = user['is_admin']
-            
-            flash('Login successful!', 'success')
-            
-            # Redirect admin to admin dashboard
-            if user['is_admin']:
-                return redirect(url_for('admin_dashboard'))
-            
-            return redirect(url_for('index'))
+            create_user_session(user, 'user')
+            flash('User login successful!', 'success')
+            return redirect(url_for('storefront.index'))
         else:
             flash('Invalid username or password', 'error')
     
     return render_template('login.html')
 
-# Admin login (separate route)
-@app.route('/admin/login', methods=['GET', 'POST'])
+@bp.route('/admin/login', methods=['GET', 'POST'])
+@public_route
 def admin_login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        admin_key = request.form.get('admin_key', '')
         
-        conn = get_db_connection()
+        conn = get_db()
         user = conn.execute(
             'SELECT * FROM users WHERE username = ? AND is_admin = 1', 
             (username,)
         ).fetchone()
-        conn.close()
         
-        # Simple admin key verification (in production, use more secure method)
-        valid_admin_key = admin_key == 'ADMIN_SECRET_2024'
-        
-        if user and user['password_hash'] == hash_password(password) and valid_admin_key:
-            session['user_id'] = user['id']
-            session['username'] = user['username']
-            session['is_admin'] = True
-            
+        if user and user['password_hash'] == hash_password(password):
+            create_user_session(user, 'admin')
             flash('Admin login successful!', 'success')
-            return redirect(url_for('admin_dashboard'))
+            return redirect(url_for('admin.admin_dashboard'))
         else:
             flash('Invalid admin credentials', 'error')
     
     return render_template('admin/login.html')
 
-# Logout
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
+    username = session.get('username', 'User')
+    session.clear()
+    flash(f'User {username} has been logged out', 'success')
+    return redirect(url_for('auth.login'))
+
+@bp.route('/admin/logout')
+def admin_logout():
+    username = session.get('username', 'Admin')
     session.clear()
-    flash('You have been logged out', 'success')
-    return redirect(url_for('index'))
\ No newline at end of file
+    flash(f'Admin {username} has been logged out', 'success')
+    return redirect(url_for('auth.admin_login'))
+
+# ==================== SESSION MANAGEMENT ROUTES ====================
+
+@bp.route('/session/switch-to-user')
+def switch_to_user_mode():
+    """Switch session to user mode"""
+    if validate_session() and session.get('is_admin'):
+        session['user_type'] = 'user'
+        flash('Switched to user mode', 'info')
+        return redirect(url_for('storefront.index'))
+    flash('Please login first', 'error')
+    return redirect(url_for('auth.login'))
+
+@bp.route('/session/switch-to-admin')
+def switch_to_admin_mode():
+    """Switch session to admin mode"""
+    if validate_session() and session.get('is_admin'):
+        session['user_type'] = 'admin'
+        flash('Switched to admin mode', 'info')
+        return redirect(url_for('admin.admin_dashboard'))
+    flash('Please login as admin first', 'error')
+    return redirect(url_for('auth.admin_login'))
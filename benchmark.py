@@ -0,0 +1,357 @@
+"""Per-route benchmark.
+
+Drives every route of the app through Flask's test client against a scratch
+copy of a database (build a large one with generate_data.py) and writes,
+per route, throughput, latency percentiles and the number of SQL statements
+executed per request to a JSON file. Pass --baseline with an earlier result
+file to print the change for each route.
+
+Usage:
+    python benchmark.py --database bench.db [--iterations 200] [--warmup 10]
+        [--output benchmark.json] [--baseline previous.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import db
+
+# Endpoints never benchmarked: static files
+SKIPPED_ENDPOINTS = {'static', 'asset'}
+
+
+class Route:
+    """One benchmarked request: `url` and `data` are callables taking (fixtures, i)
+
+    `data` is sent as a form unless `json` is true.
+    """
+
+    def __init__(self, name, client, url, method='GET', data=None, setup=None, expect=(200, 302), json=False):
+        self.name = name
+        self.client = client
+        self.url = url
+        self.method = method
+        self.data = data
+        self.json = json
+        self.setup = setup
+        self.expect = expect
+
+
+class SQLCounter:
+    """Counts statements executed through db.Connection"""
+
+    def __init__(self):
+        self.count = 0
+
+    def install(self):
+        db.statement_observers.append(self._observe)
+
+    def _observe(self, sql, parameters):
+        self.count += 1
+
+
+def book_form(fixtures, i):
+    return {
+        'title': f'Benchmark Book {i}', 'author': 'Bench Author', 'description': 'Benchmark',
+        'price': '12.50', 'genre': fixtures['genres'][i % len(fixtures['genres'])], 'stock': '25',
+        'cover_image': '', 'isbn': f'999{i:010d}', 'publisher': 'Bench', 'pages': '200',
+        'is_active': 'on',
+    }
+
+
+def load_fixtures(database, sample=100):
+    conn = sqlite3.connect(database)
+    try:
+        book_ids = [row[0] for row in conn.execute(
+            '''SELECT b.id FROM books b JOIN inventory i ON i.book_id = b.id
+               WHERE b.is_active = 1 AND i.on_hand - i.reserved > 20 ORDER BY b.id LIMIT ?''', (sample,))]
+        genres = [row[0] for row in conn.execute(
+            'SELECT DISTINCT genre FROM books WHERE is_active = 1 ORDER BY genre')]
+        words = sorted({
+            word.lower() for (title,) in conn.execute('SELECT title FROM books ORDER BY id LIMIT 200')
+            for word in title.split() if len(word) > 3
+        })
+        order_id = conn.execute('SELECT MAX(id) FROM orders').fetchone()[0] or 1
+        counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                  for table in ('books', 'users', 'orders', 'cart')}
+    finally:
+        conn.close()
+    if not book_ids:
+        sys.exit('The database has no active books with stock; generate one with generate_data.py')
+    return {'book_ids': book_ids, 'genres': genres, 'words': words or ['book'],
+            'order_id': order_id, 'counts': counts}
+
+
+def build_routes(fixtures, database, user, admin):
+    def book(f, i):
+        return f['book_ids'][i % len(f['book_ids'])]
+
+    def genre(f, i):
+        return f['genres'][i % len(f['genres'])]
+
+    def word(f, i):
+        return f['words'][i % len(f['words'])]
+
+    def fill_cart(clients, f, i):
+        clients['user'].post(f'/add_to_cart/{book(f, i)}', data={'quantity': '1'})
+
+    def place_order(clients, f, i):
+        fill_cart(clients, f, i)
+        clients['user'].post('/process_order', data={'payment_method': 'credit_card',
+                                                     'shipping_address': '1 Bench Street'})
+
+    def add_cart_row(clients, f, i):
+        fill_cart(clients, f, i)
+        conn = sqlite3.connect(database)
+        f['cart_id'] = conn.execute('SELECT MAX(id) FROM cart').fetchone()[0]
+        conn.close()
+
+    def last_order(clients, f, i):
+        conn = sqlite3.connect(database)
+        f['user_order_id'] = conn.execute(
+            'SELECT MAX(o.id) FROM orders o JOIN users u ON u.id = o.user_id WHERE u.username = ?',
+            (user['username'],)).fetchone()[0] or 0
+        conn.close()
+
+    def login_user(clients, f, i):
+        clients['user'].post('/login', data=user)
+
+    def login_admin(clients, f, i):
+        clients['admin'].post('/admin/login', data=admin)
+
+    return [
+        # Storefront
+        Route('index', 'anonymous', lambda f, i: '/'),
+        Route('books_by_genre', 'anonymous', lambda f, i: f'/books/{genre(f, i)}'),
+        Route('book_detail', 'anonymous', lambda f, i: f'/book/{book(f, i)}'),
+        Route('search', 'anonymous', lambda f, i: f'/search?q={word(f, i)}'),
+        Route('search.empty', 'anonymous', lambda f, i: '/search?q='),
+        Route('api.books', 'anonymous', lambda f, i: f'/api/v1/books?genre={genre(f, i)}'),
+        Route('api.book', 'anonymous', lambda f, i: f'/api/v1/books/{book(f, i)}'),
+        Route('api.genres', 'anonymous', lambda f, i: '/api/v1/genres'),
+        Route('api.search', 'anonymous', lambda f, i: f'/api/v1/search?q={word(f, i)}'),
+        Route('api.export_books', 'anonymous', lambda f, i: '/api/v1/books/export.ndjson?fields=id,title,price'),
+        Route('register', 'anonymous', lambda f, i: '/register'),
+        Route('register.post', 'anonymous', lambda f, i: '/register', 'POST',
+              lambda f, i: {'username': f'bench{i}', 'email': f'bench{i}@example.com',
+                            'password': 'password', 'confirm_password': 'password'}),
+        Route('login', 'anonymous', lambda f, i: '/login'),
+        Route('admin_login', 'anonymous', lambda f, i: '/admin/login'),
+
+        # Logged-in user
+        Route('login.post', 'user', lambda f, i: '/login', 'POST', lambda f, i: user),
+        Route('add_to_cart', 'user', lambda f, i: f'/add_to_cart/{book(f, i)}', 'POST',
+              lambda f, i: {'quantity': '1'}),
+        Route('cart', 'user', lambda f, i: '/cart'),
+        Route('api.cart', 'user', lambda f, i: '/api/v1/cart'),
+        Route('api.add_cart_item', 'user', lambda f, i: '/api/v1/cart/items', 'POST',
+              lambda f, i: {'book_id': book(f, i), 'quantity': 1}, json=True, expect=(200,)),
+        Route('api.set_cart_item', 'user', lambda f, i: f'/api/v1/cart/items/{book(f, i)}', 'PUT',
+              lambda f, i: {'quantity': 1 + i % 3}, json=True, expect=(200,)),
+        Route('api.remove_cart_item', 'user', lambda f, i: f'/api/v1/cart/items/{book(f, i)}', 'DELETE',
+              expect=(200,)),
+        Route('api.batch_cart', 'user', lambda f, i: '/api/v1/cart/batch', 'POST',
+              lambda f, i: {'changes': [{'op': 'set', 'book_id': book(f, i + n), 'quantity': 1}
+                                        for n in range(5)]}, json=True, expect=(200,)),
+        Route('checkout', 'user', lambda f, i: '/checkout'),
+        Route('remove_from_cart', 'user', lambda f, i: f"/remove_from_cart/{f['cart_id']}", setup=add_cart_row),
+        Route('process_order', 'user', lambda f, i: '/process_order', 'POST',
+              lambda f, i: {'payment_method': 'credit_card', 'shipping_address': '1 Bench Street'},
+              setup=fill_cart),
+        Route('payment', 'user', lambda f, i: '/payment'),
+        Route('complete_payment', 'user', lambda f, i: '/complete_payment', 'POST', lambda f, i: {},
+              setup=place_order, expect=(200,)),
+        Route('profile', 'user', lambda f, i: '/profile'),
+        Route('order_detail', 'user', lambda f, i: f"/orders/{f['user_order_id']}", setup=last_order),
+        Route('logout', 'user', lambda f, i: '/logout', setup=login_user),
+
+        # Admin
+        Route('admin_login.post', 'admin', lambda f, i: '/admin/login', 'POST', lambda f, i: admin),
+        Route('admin_dashboard', 'admin', lambda f, i: '/admin/dashboard'),
+        Route('admin_books', 'admin', lambda f, i: '/admin/books'),
+        Route('admin_users', 'admin', lambda f, i: '/admin/users'),
+        Route('admin_orders', 'admin', lambda f, i: '/admin/orders'),
+        Route('admin_orders.pending', 'admin', lambda f, i: '/admin/orders?status=pending'),
+        Route('admin_reports', 'admin', lambda f, i: '/admin/reports'),
+        Route('admin_reports_json', 'admin', lambda f, i: '/admin/reports.json'),
+        Route('admin_metrics', 'admin', lambda f, i: '/admin/metrics'),
+        Route('admin_slow_queries', 'admin', lambda f, i: '/admin/slow-queries'),
+        Route('clear_slow_queries', 'admin', lambda f, i: '/admin/slow-queries/clear', 'POST', lambda f, i: {}),
+        Route('add_book', 'admin', lambda f, i: '/admin/books/add'),
+        Route('add_book.post', 'admin', lambda f, i: '/admin/books/add', 'POST', book_form),
+        Route('edit_book', 'admin', lambda f, i: f'/admin/books/edit/{book(f, i)}'),
+        Route('edit_book.post', 'admin', lambda f, i: f"/admin/books/edit/{f['book_ids'][0]}", 'POST',
+              lambda f, i: dict(book_form(f, i), isbn=f'999{i:010d}')),
+        Route('update_order_status', 'admin', lambda f, i: f"/admin/orders/update_status/{f['order_id']}",
+              'POST', lambda f, i: {'status': ('pending', 'completed')[i % 2]}),
+        Route('switch_to_user_mode', 'admin', lambda f, i: '/session/switch-to-user'),
+        Route('switch_to_admin_mode', 'admin', lambda f, i: '/session/switch-to-admin'),
+        Route('admin_logout', 'admin', lambda f, i: '/admin/logout', setup=login_admin),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def run_route(route, clients, fixtures, counter, iterations, warmup):
+    latencies = []
+    statements = []
+    statuses = {}
+    errors = 0
+    client = clients[route.client]
+
+    for i in range(warmup + iterations):
+        if route.setup:
+            route.setup(clients, fixtures, i)
+        url = route.url(fixtures, i)
+        data = route.data(fixtures, i) if route.data else None
+
+        counter.count = 0
+        started = time.perf_counter()
+        if route.json:
+            response = client.open(url, method=route.method, json=data)
+        else:
+            response = client.open(url, method=route.method, data=data)
+        response.get_data()
+        elapsed = time.perf_counter() - started
+
+        if i < warmup:
+            continue
+        latencies.append(elapsed * 1000)
+        statements.append(counter.count)
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+        if response.status_code not in route.expect:
+            errors += 1
+
+    latencies.sort()
+    return {
+        'method': route.method,
+        'requests': iterations,
+        'errors': errors,
+        'status': statuses,
+        'throughput_rps': round(iterations / (sum(latencies) / 1000), 1) if latencies else 0.0,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'p50': round(percentile(latencies, 0.50), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+            'max': round(latencies[-1], 3),
+        },
+        'sql': {
+            'mean': round(sum(statements) / len(statements), 2),
+            'max': max(statements),
+        },
+    }
+
+
+def endpoint_of(app, route, fixtures):
+    adapter = app.url_map.bind('localhost')
+    path = route.url(fixtures, 0).partition('?')[0]
+    return adapter.match(path, method=route.method)[0]
+
+
+def compare(results, baseline):
+    print(f"\n{'route':<26}{'p50 ms':>18}{'p95 ms':>18}{'sql':>14}")
+    for name, current in results['routes'].items():
+        previous = baseline.get('routes', {}).get(name)
+        if previous is None:
+            continue
+
+        def change(old, new):
+            return f"{new:>8.2f} ({(new - old) / old * 100:+.0f}%)" if old else f"{new:>8.2f}"
+
+        print(f"{name:<26}"
+              f"{change(previous['latency_ms']['p50'], current['latency_ms']['p50']):>18}"
+              f"{change(previous['latency_ms']['p95'], current['latency_ms']['p95']):>18}"
+              f"{previous['sql']['mean']:>6.1f} -> {current['sql']['mean']:<5.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark every route of the bookstore app')
+    parser.add_argument('--database', default='bench.db', help='database to copy and benchmark against')
+    parser.add_argument('--iterations', type=int, default=200, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=10, help='untimed requests per route')
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--baseline', help='earlier result file to compare against')
+    parser.add_argument('--user', default='user000001', help='username of an existing regular user')
+    parser.add_argument('--password', default='password')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.database):
+        sys.exit(f"{args.database} not found; create it with generate_data.py")
+
+    # Routes write (orders, carts, books), so run against a scratch copy
+    workdir = tempfile.mkdtemp(prefix='bookstore-bench-')
+    database = os.path.join(workdir, 'bench.db')
+    source = sqlite3.connect(args.database)
+    target = sqlite3.connect(database)
+    source.backup(target)
+    source.close()
+    target.close()
+
+    os.environ['BOOKSTORE_DATABASE'] = database
+    counter = SQLCounter()
+    counter.install()
+    from app import app
+
+    fixtures = load_fixtures(database)
+    clients = {'anonymous': app.test_client(), 'user': app.test_client(), 'admin': app.test_client()}
+    user = {'username': args.user, 'password': args.password}
+    admin = {'username': 'admin', 'password': 'admin123'}
+    clients['user'].post('/login', data=user)
+    clients['admin'].post('/admin/login', data=admin)
+
+    routes = build_routes(fixtures, database, user, admin)
+    results = {
+        'meta': {
+            'database': os.path.abspath(args.database),
+            'rows': fixtures['counts'],
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+        },
+        'routes': {},
+    }
+
+    covered = set()
+    try:
+        for route in routes:
+            stats = run_route(route, clients, fixtures, counter, max(args.iterations, 1), args.warmup)
+            stats['endpoint'] = endpoint_of(app, route, fixtures)
+            covered.add(stats['endpoint'])
+            results['routes'][route.name] = stats
+            flag = f"  ({stats['errors']} unexpected responses)" if stats['errors'] else ''
+            print(f"{route.name:<26} p50 {stats['latency_ms']['p50']:>8.2f} ms  "
+                  f"p99 {stats['latency_ms']['p99']:>8.2f} ms  "
+                  f"{stats['throughput_rps']:>8.1f} req/s  {stats['sql']['mean']:>5.1f} sql{flag}")
+    finally:
+        app.extensions['db_pool'].close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    missing = sorted({rule.endpoint for rule in app.url_map.iter_rules()} - covered - SKIPPED_ENDPOINTS)
+    if missing:
+        print(f"\nNot benchmarked: {', '.join(missing)}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
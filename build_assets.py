@@ -0,0 +1,178 @@
+"""Build fingerprinted, precompressed static assets.
+
+Steps:
+1. Vendor third-party CSS/JS/fonts into static/vendor/ (downloaded once,
+   use --refresh to fetch again).
+2. Minify our own CSS/JS.
+3. Write content-hashed copies of every asset to static/dist/ with .gz and,
+   if the optional `brotli` package is installed, .br siblings.
+4. Write static/dist/manifest.json, which assets.py uses at runtime.
+
+Usage:
+    python build_assets.py [--refresh] [--skip-vendor]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import urllib.parse
+import urllib.request
+
+from assets import DIST_DIR, MANIFEST_NAME, VENDOR_ASSETS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# Our own assets, minified and fingerprinted on every build
+SOURCE_ASSETS = ('css/style.css', 'js/script.js')
+
+# Text files worth precompressing; fonts are already compressed (woff2)
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.ttf')
+
+# Google Fonts only serves woff2 to browsers it recognises
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+CSS_URL = re.compile(r'url\((["\']?)([^)"\']+)\1\)')
+SOURCE_MAP = re.compile(r'/\*# sourceMappingURL=[^*]*\*/|//# sourceMappingURL=\S*')
+
+
+def fetch(url):
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.read()
+
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def vendor_css(url, dest):
+    """Download a stylesheet and every file its url() references, rewriting them to local paths"""
+    css = SOURCE_MAP.sub('', fetch(url).decode('utf-8'))
+    dest_dir = os.path.dirname(dest)
+    downloaded = {}
+
+    def localise(match):
+        quote, ref = match.groups()
+        if ref.startswith('data:'):
+            return match.group(0)
+        absolute = urllib.parse.urljoin(url, ref)
+        if not ref.startswith(('http:', 'https:', '//')):
+            # Relative reference: keep the same layout next to the stylesheet
+            local = os.path.normpath(ref.split('?')[0].split('#')[0])
+        else:
+            local = os.path.join('files', os.path.basename(urllib.parse.urlparse(absolute).path))
+        target = os.path.join(dest_dir, local)
+        if absolute not in downloaded:
+            write_file(target, fetch(absolute.split('#')[0]))
+            downloaded[absolute] = local
+        return f'url({quote}{local.replace(os.sep, "/")}{quote})'
+
+    write_file(dest, CSS_URL.sub(localise, css).encode('utf-8'))
+    return len(downloaded)
+
+
+def vendor_assets(refresh=False):
+    for name, (local, url) in VENDOR_ASSETS.items():
+        dest = os.path.join(STATIC_DIR, local)
+        if os.path.exists(dest) and not refresh:
+            continue
+        if dest.endswith('.css'):
+            count = vendor_css(url, dest)
+            print(f"Vendored {name} ({count} referenced files)")
+        else:
+            write_file(dest, SOURCE_MAP.sub('', fetch(url).decode('utf-8')).encode('utf-8'))
+            print(f"Vendored {name}")
+
+
+def minify_css(text):
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    # Conservative: drop whole-line comments, indentation and blank lines,
+    # never touching code or string contents within a line.
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped and not stripped.startswith('//'):
+            lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+
+def fingerprint(relative, data):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    root, ext = os.path.splitext(relative)
+    return f'{root}.{digest}{ext}'
+
+
+def write_compressed(path, data):
+    write_file(path, data)
+    if path.endswith(COMPRESSIBLE):
+        write_file(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            write_file(path + '.br', brotli.compress(data, quality=11))
+
+
+def build():
+    dist = os.path.join(STATIC_DIR, DIST_DIR)
+    if os.path.isdir(dist):
+        shutil.rmtree(dist)
+    manifest = {}
+
+    for relative in SOURCE_ASSETS:
+        with open(os.path.join(STATIC_DIR, relative), encoding='utf-8') as f:
+            text = f.read()
+        data = (minify_css(text) if relative.endswith('.css') else minify_js(text)).encode('utf-8')
+        hashed = fingerprint(relative, data)
+        write_compressed(os.path.join(dist, hashed), data)
+        manifest[relative] = hashed
+
+    # Vendored files keep their names (their directories carry the library
+    # version) so relative url() references inside vendored CSS still resolve;
+    # the entry points themselves are fingerprinted.
+    entry_points = {local for local, _ in VENDOR_ASSETS.values()}
+    vendor_root = os.path.join(STATIC_DIR, 'vendor')
+    for directory, _, files in os.walk(vendor_root):
+        for filename in files:
+            source = os.path.join(directory, filename)
+            relative = os.path.relpath(source, STATIC_DIR).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+            if relative in entry_points:
+                hashed = fingerprint(relative, data)
+                manifest[relative] = hashed
+                write_compressed(os.path.join(dist, hashed), data)
+            write_compressed(os.path.join(dist, relative), data)
+
+    write_file(os.path.join(dist, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    print(f"Built {len(manifest)} fingerprinted assets into static/{DIST_DIR}/"
+          + ('' if brotli else ' (install brotli for .br files)'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build fingerprinted static assets')
+    parser.add_argument('--refresh', action='store_true', help='download vendored assets again')
+    parser.add_argument('--skip-vendor', action='store_true', help='do not download vendored assets')
+    args = parser.parse_args(argv)
+
+    if not args.skip_vendor:
+        vendor_assets(refresh=args.refresh)
+    build()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Generate responsive cover renditions.
+
+Every image in static/images/books/ is resized to each width in
+RENDITION_WIDTHS (never upscaled) and saved as WebP and JPEG in
+static/images/books/renditions/, using a process pool. Covers whose content
+hash matches the previous manifest and whose renditions still exist are
+skipped, so re-running after adding a few covers only processes those.
+
+Requires Pillow:
+    pip install Pillow
+    python build_covers.py [--force] [--workers N]
+"""
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from covers import COVERS_DIR, MANIFEST_NAME, RENDITIONS_DIR
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+SOURCE_DIR = os.path.join(STATIC_DIR, COVERS_DIR)
+OUTPUT_DIR = os.path.join(STATIC_DIR, RENDITIONS_DIR)
+
+RENDITION_WIDTHS = (120, 240, 480)
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+# (manifest key, file extension, Pillow format, save options)
+FORMATS = (
+    ('webp', 'webp', 'WEBP', {'quality': 80, 'method': 6}),
+    ('jpeg', 'jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def render_cover(filename, source_hash):
+    """Write every rendition of one cover and return its manifest entry"""
+    stem = os.path.splitext(filename)[0]
+    with Image.open(os.path.join(SOURCE_DIR, filename)) as image:
+        image = image.convert('RGB')
+        width, height = image.size
+        widths = sorted({w for w in RENDITION_WIDTHS if w < width} | {min(width, max(RENDITION_WIDTHS))})
+
+        renditions = {key: [] for key, _, _, _ in FORMATS}
+        for target_width in widths:
+            target_height = round(height * target_width / width)
+            resized = image if target_width == width else image.resize((target_width, target_height), Image.LANCZOS)
+            for key, extension, pil_format, options in FORMATS:
+                name = f'{stem}-{target_width}.{source_hash[:8]}.{extension}'
+                resized.save(os.path.join(OUTPUT_DIR, name), pil_format, **options)
+                renditions[key].append([target_width, name])
+
+    return {'hash': source_hash, 'width': width, 'height': height, 'renditions': renditions}
+
+
+def is_current(entry, source_hash):
+    if not entry or entry.get('hash') != source_hash:
+        return False
+    return all(
+        os.path.exists(os.path.join(OUTPUT_DIR, name))
+        for renditions in entry['renditions'].values()
+        for _, name in renditions
+    )
+
+
+def build(force=False, workers=None):
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    manifest_path = os.path.join(OUTPUT_DIR, MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+
+    sources = sorted(
+        name for name in os.listdir(SOURCE_DIR)
+        if name.lower().endswith(SOURCE_EXTENSIONS) and os.path.isfile(os.path.join(SOURCE_DIR, name))
+    )
+
+    manifest = {}
+    pending = {}
+    for filename in sources:
+        source_hash = file_hash(os.path.join(SOURCE_DIR, filename))
+        if not force and is_current(previous.get(filename), source_hash):
+            manifest[filename] = previous[filename]
+        else:
+            pending[filename] = source_hash
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {name: pool.submit(render_cover, name, source_hash) for name, source_hash in pending.items()}
+        for filename, future in futures.items():
+            manifest[filename] = future.result()
+            print(f'Rendered: {filename}')
+
+    # Remove renditions no longer referenced by any cover
+    referenced = {
+        name for entry in manifest.values()
+        for renditions in entry['renditions'].values()
+        for _, name in renditions
+    }
+    for name in os.listdir(OUTPUT_DIR):
+        if name != MANIFEST_NAME and name not in referenced:
+            os.remove(os.path.join(OUTPUT_DIR, name))
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"\n{len(pending)} cover(s) rendered, {len(sources) - len(pending)} unchanged")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate responsive book cover renditions')
+    parser.add_argument('--force', action='store_true', help='re-render every cover')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    args = parser.parse_args(argv)
+    build(force=args.force, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe least-recently-used mapping with hit/miss counters"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def items(self):
+        """Snapshot of (key, value) pairs, least recently used first"""
+        with self._lock:
+            return list(self._data.items())
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
+
+
+class CatalogVersion:
+    """Catalog version number shared by every worker through the database.
+
+    Triggers on the books table bump catalog_state.version whenever catalog
+    data changes. Each process re-reads the stored value at most once per
+    `ttl` seconds, so cached catalog data is keyed by a number that is
+    normally a memory lookup and lags other workers' writes by at most ttl.
+    """
+
+    def __init__(self, ttl=2.0):
+        self.ttl = ttl
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, conn):
+        now = time.monotonic()
+        if self._version is None or now - self._checked_at >= self.ttl:
+            row = conn.execute('SELECT version FROM catalog_state WHERE id = 1').fetchone()
+            with self._lock:
+                self._version = row[0] if row else 0
+                self._checked_at = now
+        return self._version
+
+    def invalidate(self):
+        """Force the next get() to re-read the version, e.g. after a local write"""
+        with self._lock:
+            self._version = None
+
+
+catalog_version = CatalogVersion()
+
+
+# COUNT(*) results for catalog listings, keyed by (catalog version, key)
+count_cache = LRUCache(maxsize=1024)
+
+
+def cached_count(conn, key, sql, params=()):
+    """Return a COUNT(*) result, cached until the catalog version changes"""
+    cache_key = (catalog_version.get(conn), key)
+    total = count_cache.get(cache_key)
+    if total is None:
+        total = conn.execute(sql, params).fetchone()[0]
+        count_cache.set(cache_key, total)
+    return total
@@ -0,0 +1,133 @@
+"""Cart changes as single upsert statements.
+
+Each change is one INSERT ... ON CONFLICT(user_id, book_id) statement (or a
+DELETE) whose WHERE clause also checks that the book is active and has
+enough available stock (inventory.on_hand - reserved), so there is no
+SELECT-then-write race and no extra round trip. A statement that touches no
+row means the change was refused; only then is the book looked up again to
+say why. apply_changes() runs several changes as one write on the writer
+thread (writer.py) and keeps none of them if any is refused.
+"""
+from catalog import cart_lines
+
+TAX_RATE = 0.1
+MAX_BATCH = 100
+OPERATIONS = ('add', 'set', 'remove')
+
+
+class CartError(Exception):
+    """Base class for cart changes that cannot be applied"""
+
+
+class BookNotFoundError(CartError):
+    def __init__(self, book_id):
+        super().__init__('Book not found')
+        self.book_id = book_id
+
+
+class NotEnoughStockError(CartError):
+    def __init__(self, title, available):
+        super().__init__(f'Not enough stock for {title} ({available} available)')
+        self.title = title
+        self.available = available
+
+
+def _refused(conn, book_id):
+    book = conn.execute('''
+        SELECT b.title, i.on_hand - i.reserved AS stock
+        FROM books b JOIN inventory i ON i.book_id = b.id
+        WHERE b.id = ? AND b.is_active = 1
+    ''', (book_id,)).fetchone()
+    if book is None:
+        return BookNotFoundError(book_id)
+    return NotEnoughStockError(book['title'], book['stock'])
+
+
+def _add(conn, user_id, book_id, quantity):
+    cursor = conn.execute('''
+        INSERT INTO cart (user_id, book_id, quantity)
+        SELECT ?, b.id, ? FROM books b JOIN inventory i ON i.book_id = b.id
+        WHERE b.id = ? AND b.is_active = 1 AND i.on_hand - i.reserved >= ?
+        ON CONFLICT (user_id, book_id) DO UPDATE
+        SET quantity = quantity + excluded.quantity
+        WHERE (SELECT on_hand - reserved FROM inventory WHERE book_id = excluded.book_id)
+              >= quantity + excluded.quantity
+    ''', (user_id, quantity, book_id, quantity))
+    return cursor.rowcount == 1
+
+
+def _set(conn, user_id, book_id, quantity):
+    if quantity <= 0:
+        return _remove(conn, user_id, book_id)
+    cursor = conn.execute('''
+        INSERT INTO cart (user_id, book_id, quantity)
+        SELECT ?, b.id, ? FROM books b JOIN inventory i ON i.book_id = b.id
+        WHERE b.id = ? AND b.is_active = 1 AND i.on_hand - i.reserved >= ?
+        ON CONFLICT (user_id, book_id) DO UPDATE SET quantity = excluded.quantity
+    ''', (user_id, quantity, book_id, quantity))
+    return cursor.rowcount == 1
+
+
+def _remove(conn, user_id, book_id, quantity=None):
+    conn.execute('DELETE FROM cart WHERE user_id = ? AND book_id = ?', (user_id, book_id))
+    return True
+
+
+_APPLY = {'add': _add, 'set': _set, 'remove': _remove}
+
+
+def parse_change(data):
+    """Validate one {op, book_id, quantity} mapping; raise ValueError if malformed"""
+    if not isinstance(data, dict):
+        raise ValueError('Each change must be an object')
+    op = data.get('op')
+    if op not in OPERATIONS:
+        raise ValueError(f"op must be one of: {', '.join(OPERATIONS)}")
+    try:
+        book_id = int(data.get('book_id'))
+        quantity = int(data.get('quantity', 1 if op == 'add' else 0))
+    except (TypeError, ValueError):
+        raise ValueError('book_id and quantity must be integers') from None
+    if op == 'add' and quantity < 1:
+        raise ValueError('quantity must be at least 1')
+    return op, book_id, quantity
+
+
+def apply_changes(conn, user_id, changes):
+    """Apply (op, book_id, quantity) changes; a write, see writer.py.
+
+    Raises BookNotFoundError or NotEnoughStockError, and the writer rolls
+    back any changes already applied.
+    """
+    for op, book_id, quantity in changes:
+        if not _APPLY[op](conn, user_id, book_id, quantity):
+            raise _refused(conn, book_id)
+
+
+def add_item(conn, user_id, book_id, quantity=1):
+    apply_changes(conn, user_id, [('add', book_id, quantity)])
+
+
+def remove_line(conn, user_id, cart_id):
+    conn.execute('DELETE FROM cart WHERE id = ? AND user_id = ?', (cart_id, user_id))
+
+
+def summary(conn, user_id):
+    """The cart as a JSON-ready dict: lines plus item count and totals"""
+    lines = cart_lines(conn, user_id, active_only=True)
+    subtotal = sum(line['price'] * line['quantity'] for line in lines)
+    return {
+        'items': [{
+            'book_id': line['book_id'],
+            'title': line['title'],
+            'author': line['author'],
+            'price': line['price'],
+            'quantity': line['quantity'],
+            'line_total': round(line['price'] * line['quantity'], 2),
+            'stock': line['stock'],
+        } for line in lines],
+        'item_count': sum(line['quantity'] for line in lines),
+        'subtotal': round(subtotal, 2),
+        'tax': round(subtotal * TAX_RATE, 2),
+        'total': round(subtotal * (1 + TAX_RATE), 2),
+    }
@@ -0,0 +1,141 @@
+"""In-process cache of catalog records.
+
+Book rows are read by id on nearly every storefront request. The cache keeps
+compact Book records in an LRU keyed by book id, each tagged with the catalog
+version it was loaded under, so a catalog change anywhere invalidates every
+record at once. Stock is not part of the record: it lives in the inventory
+table, changes with every order and is always read fresh with stock_levels().
+"""
+import threading
+
+from cache import LRUCache, catalog_version
+
+BOOK_COLUMNS = (
+    'id', 'title', 'author', 'description', 'price', 'genre', 'cover_image',
+    'isbn', 'publisher', 'pages', 'is_featured', 'is_active', 'created_at',
+)
+_SELECT_BOOK = f"SELECT {', '.join(BOOK_COLUMNS)} FROM books"
+
+
+class Book:
+    """Catalog fields of one book, without stock"""
+
+    __slots__ = BOOK_COLUMNS
+
+    def __init__(self, row):
+        for name in BOOK_COLUMNS:
+            setattr(self, name, row[name])
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def keys(self):
+        return BOOK_COLUMNS
+
+    def __repr__(self):
+        return f'<Book {self.id} {self.title!r}>'
+
+
+class CatalogCache:
+    def __init__(self, maxsize=4096):
+        self._books = LRUCache(maxsize)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_book(self, conn, book_id):
+        """Return the Book with this id, or None if it does not exist"""
+        return self.get_books(conn, [book_id]).get(book_id)
+
+    def get_books(self, conn, book_ids):
+        """Return {id: Book} for the given ids, loading misses in one query"""
+        version = catalog_version.get(conn)
+        found = {}
+        missing = []
+        requested = list(dict.fromkeys(book_ids))
+        for book_id in requested:
+            entry = self._books.get(book_id)
+            if entry is not None and entry[0] == version:
+                found[book_id] = entry[1]
+            else:
+                missing.append(book_id)
+
+        if missing:
+            placeholders = ', '.join('?' * len(missing))
+            rows = conn.execute(f'{_SELECT_BOOK} WHERE id IN ({placeholders})', missing).fetchall()
+            for row in rows:
+                book = Book(row)
+                self._books.set(book.id, (version, book))
+                found[book.id] = book
+
+        with self._lock:
+            self.hits += len(requested) - len(missing)
+            self.misses += len(missing)
+        return found
+
+    def clear(self):
+        self._books.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._books),
+            'maxsize': self._books.maxsize,
+        }
+
+
+catalog_cache = CatalogCache()
+
+
+def stock_levels(conn, book_ids):
+    """Return {book_id: available stock} read straight from the inventory table"""
+    book_ids = list(dict.fromkeys(book_ids))
+    if not book_ids:
+        return {}
+    placeholders = ', '.join('?' * len(book_ids))
+    rows = conn.execute(f'''
+        SELECT book_id, on_hand - reserved AS stock FROM inventory WHERE book_id IN ({placeholders})
+    ''', book_ids)
+    return {row['book_id']: row['stock'] for row in rows}
+
+
+def set_stock(conn, book_id, stock):
+    """Make `stock` copies available on top of those reserved by pending orders; a write, see writer.py"""
+    conn.execute('''
+        UPDATE inventory SET on_hand = reserved + ?, updated_at = CURRENT_TIMESTAMP
+        WHERE book_id = ?
+    ''', (stock, book_id))
+
+
+def cart_lines(conn, user_id, active_only=False):
+    """Return the user's cart as dicts combining cart rows, cached book data and live stock"""
+    rows = conn.execute('''
+        SELECT c.id, c.user_id, c.book_id, c.quantity, c.created_at, i.on_hand - i.reserved AS stock
+        FROM cart c
+        JOIN inventory i ON i.book_id = c.book_id
+        WHERE c.user_id = ?
+    ''', (user_id,)).fetchall()
+    books = catalog_cache.get_books(conn, [row['book_id'] for row in rows])
+
+    lines = []
+    for row in rows:
+        book = books.get(row['book_id'])
+        if book is None or (active_only and not book.is_active):
+            continue
+        lines.append({
+            'id': row['id'],
+            'user_id': row['user_id'],
+            'book_id': row['book_id'],
+            'quantity': row['quantity'],
+            'created_at': row['created_at'],
+            'title': book.title,
+            'author': book.author,
+            'price': book.price,
+            'cover_image': book.cover_image,
+            'stock': row['stock'],
+        })
+    return lines
@@ -0,0 +1,172 @@
+"""Cart, checkout, payment and the user's order history.
+
+Every page here needs a logged-in user (auth.user_required). Cart changes
+and orders (orders.place_order()) are written by the writer thread
+(writer.py); receipts and other follow-up work are queued as background
+jobs (jobs.py).
+"""
+from flask import Blueprint, flash, redirect, render_template, request, session, url_for
+
+import jobs
+from auth import user_required
+from carts import BookNotFoundError, NotEnoughStockError, add_item, remove_line
+from catalog import cart_lines
+from db import get_db
+from orders import EmptyCartError, OrderError, OutOfStockError, pay_order, place_order
+from pagination import fetch_page, page_size
+from storefront import page_links
+from writer import write
+
+bp = Blueprint('checkout', __name__)
+
+
+@bp.route('/add_to_cart/<int:book_id>', methods=['POST'])
+@user_required
+def add_to_cart(book_id):
+    quantity = max(int(request.form.get('quantity', 1)), 1)
+    
+    try:
+        write(add_item, session['user_id'], book_id, quantity)
+    except BookNotFoundError:
+        flash('Book not found', 'error')
+        return redirect(url_for('storefront.index'))
+    except NotEnoughStockError:
+        flash('Not enough stock available', 'error')
+        return redirect(url_for('storefront.book_detail', book_id=book_id))
+    
+    flash('Book added to cart successfully', 'success')
+    return redirect(url_for('storefront.book_detail', book_id=book_id))
+
+@bp.route('/cart')
+@user_required
+def cart():
+    conn = get_db()
+    cart_items = cart_lines(conn, session['user_id'], active_only=True)
+    
+    total_amount = sum(item['price'] * item['quantity'] for item in cart_items)
+    
+    return render_template('cart.html', cart_items=cart_items, total_amount=total_amount)
+
+@bp.route('/remove_from_cart/<int:cart_id>')
+@user_required
+def remove_from_cart(cart_id):
+    write(remove_line, session['user_id'], cart_id)
+    
+    flash('Item removed from cart', 'success')
+    return redirect(url_for('checkout.cart'))
+
+@bp.route('/checkout')
+@user_required
+def checkout():
+    conn = get_db()
+    cart_items = cart_lines(conn, session['user_id'])
+    
+    if not cart_items:
+        flash('Your cart is empty', 'error')
+        return redirect(url_for('checkout.cart'))
+    
+    for item in cart_items:
+        if item['stock'] < item['quantity']:
+            flash(f'Not enough stock for {item["title"]}', 'error')
+            return redirect(url_for('checkout.cart'))
+    
+    total_amount = sum(item['price'] * item['quantity'] for item in cart_items)
+    
+    return render_template('checkout.html', cart_items=cart_items, total_amount=total_amount)
+
+@bp.route('/process_order', methods=['POST'])
+@user_required
+def process_order():
+    payment_method = request.form.get('payment_method')
+    shipping_address = request.form.get('shipping_address')
+    
+    if not shipping_address:
+        flash('Please enter shipping address', 'error')
+        return redirect(url_for('checkout.checkout'))
+    
+    try:
+        order_id = write(place_order, session['user_id'], payment_method, shipping_address)
+    except EmptyCartError:
+        flash('Your cart is empty', 'error')
+        return redirect(url_for('checkout.cart'))
+    except OutOfStockError as e:
+        flash(f'Not enough stock for {e.title}', 'error')
+        return redirect(url_for('checkout.cart'))
+    jobs.wake()
+    
+    session['order_id'] = order_id
+    return redirect(url_for('checkout.payment'))
+
+@bp.route('/payment')
+@user_required
+def payment():
+    if 'order_id' not in session:
+        return redirect(url_for('storefront.index'))
+    
+    conn = get_db()
+    order = conn.execute('SELECT * FROM orders WHERE id = ?', (session['order_id'],)).fetchone()
+    
+    return render_template('payment.html', order=order)
+
+@bp.route('/complete_payment', methods=['POST'])
+@user_required
+def complete_payment():
+    if 'order_id' not in session:
+        return redirect(url_for('storefront.index'))
+    
+    # Receipts and other follow-up work run in the job workers
+    try:
+        write(pay_order, session['order_id'], session['user_id'])
+    except OrderError as e:
+        session.pop('order_id', None)
+        flash(str(e), 'error')
+        return redirect(url_for('checkout.profile'))
+    jobs.wake()
+    
+    conn = get_db()
+    order = conn.execute('SELECT * FROM orders WHERE id = ?', (session['order_id'],)).fetchone()
+    
+    order_id = session.pop('order_id', None)
+    
+    return render_template('order_confirmation.html', order=order)
+
+@bp.route('/profile')
+@user_required
+def profile():
+    per_page = page_size(request.args.get('per_page'))
+    conn = get_db()
+    
+    # Summaries are stored on the order row, so a page reads per_page + 1
+    # rows from idx_orders_user_created however many orders the user has
+    page = fetch_page(conn, '''
+        SELECT id, created_at, total_amount, status, item_count, book_titles
+        FROM orders
+        WHERE user_id = ? AND {keyset}
+        ORDER BY {order}
+        LIMIT ?
+    ''', [session['user_id']], [('created_at', 'created_at'), ('id', 'id')],
+        request.args.get('after'), request.args.get('before'), per_page, descending=True)
+    
+    return render_template('profile.html', orders=page.items,
+                           pagination=page_links(page, 'checkout.profile'))
+
+@bp.route('/orders/<int:order_id>')
+@user_required
+def order_detail(order_id):
+    conn = get_db()
+    order = conn.execute('SELECT * FROM orders WHERE id = ? AND user_id = ?',
+                         (order_id, session['user_id'])).fetchone()
+    
+    if not order:
+        flash('Order not found', 'error')
+        return redirect(url_for('checkout.profile'))
+    
+    items = conn.execute('''
+        SELECT oi.book_id, oi.quantity, oi.price, COALESCE(b.title, 'Book #' || oi.book_id) AS title,
+               b.author, b.is_active
+        FROM order_items oi LEFT JOIN books b ON b.id = oi.book_id
+        WHERE oi.order_id = ?
+        ORDER BY oi.id
+    ''', (order_id,)).fetchall()
+    
+    return render_template('order_detail.html', order=order, items=items)
@@ -0,0 +1,70 @@
+"""Conditional GET support for catalog pages.
+
+A view decorated with @conditional(validators) first calls `validators`
+with the view's arguments. It returns the values that determine the page
+(catalog version, book updated_at, stock...) and optionally a Last-Modified
+datetime, or None to skip conditional handling. When the client's
+If-None-Match / If-Modified-Since still matches, a 304 is returned without
+running the view or rendering any template.
+
+Pages include the navigation bar for the current user, so the ETag also
+varies by session identity. Anonymous responses may be stored by shared
+caches; logged-in responses are private and always revalidated.
+"""
+import hashlib
+from functools import wraps
+
+from flask import make_response, request, session
+
+
+def _session_variant():
+    if 'user_id' in session:
+        return ('user', session['user_id'], session.get('user_type'), session.get('is_admin'))
+    return ('anonymous',)
+
+
+def _apply_caching(response, etag, last_modified, max_age):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    if 'user_id' in session:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    else:
+        response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    response.vary.add('Cookie')
+    return response
+
+
+def conditional(validators, max_age=0):
+    """Decorator adding ETag/Last-Modified validation to a GET view"""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            # Pending flash messages are rendered once and then consumed, so
+            # such responses must never be replaced by a cached copy.
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            result = validators(*args, **kwargs)
+            if result is None:
+                return view(*args, **kwargs)
+            parts, last_modified = result
+
+            key = repr((parts, request.full_path, _session_variant())).encode()
+            etag = hashlib.sha1(key).hexdigest()[:24]
+
+            not_modified = False
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            elif last_modified is not None and request.if_modified_since is not None:
+                not_modified = last_modified.replace(microsecond=0) <= request.if_modified_since
+
+            if not_modified:
+                return _apply_caching(make_response('', 304), etag, last_modified, max_age)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _apply_caching(response, etag, last_modified, max_age)
+            return response
+        return wrapped
+    return decorator
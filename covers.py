@@ -0,0 +1,56 @@
+"""Responsive book cover images.
+
+build_covers.py renders every cover in static/images/books/ at several
+widths in WebP and JPEG and records them in a manifest. Templates call
+cover_renditions() (through the cover() macro in templates/macros.html) to
+emit <picture> markup with srcset/sizes, so listing pages download a small
+thumbnail instead of the full-size cover. Covers missing from the manifest
+fall back to the original file.
+"""
+import json
+import os
+
+from flask import current_app, url_for
+
+COVERS_DIR = 'images/books'
+RENDITIONS_DIR = 'images/books/renditions'
+MANIFEST_NAME = 'manifest.json'
+DEFAULT_COVER = 'default.jpg'
+
+
+def load_manifest(static_folder):
+    path = os.path.join(static_folder, RENDITIONS_DIR, MANIFEST_NAME)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_app(app):
+    app.extensions['cover_manifest'] = load_manifest(app.static_folder)
+    app.jinja_env.globals['cover_renditions'] = cover_renditions
+
+
+def _srcset(renditions):
+    return ', '.join(
+        f"{url_for('static', filename=f'{RENDITIONS_DIR}/{name}')} {width}w"
+        for width, name in renditions
+    )
+
+
+def cover_renditions(cover_image):
+    """Return src/srcset data for a cover filename (or the default cover)"""
+    filename = cover_image or DEFAULT_COVER
+    entry = current_app.extensions['cover_manifest'].get(filename)
+    if entry is None:
+        return {'src': url_for('static', filename=f'{COVERS_DIR}/{filename}')}
+
+    jpeg = entry['renditions']['jpeg']
+    return {
+        'src': url_for('static', filename=f'{RENDITIONS_DIR}/{jpeg[-1][1]}'),
+        'jpeg_srcset': _srcset(jpeg),
+        'webp_srcset': _srcset(entry['renditions']['webp']),
+        'width': entry['width'],
+        'height': entry['height'],
+    }
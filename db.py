@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import threading
+import weakref
+
+from flask import current_app, g
+
+DEFAULT_DATABASE = 'bookstore.db'
+
+# Applied to every new connection. journal_mode is persistent in the database
+# file, the rest are per-connection settings.
+CONNECTION_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', 5000),
+    ('cache_size', -16000),
+    ('mmap_size', 268435456),
+    ('temp_store', 'MEMORY'),
+)
+
+# Number of prepared statements sqlite3 keeps per connection (default is 128)
+CACHED_STATEMENTS = 512
+
+# Callables run on every new connection, e.g. to install a progress handler
+connection_hooks = []
+
+# Callables receiving (sql, parameters) for every Connection.execute() and
+# executemany() call (parameters is None for executemany), e.g. to count
+# statements per request
+statement_observers = []
+
+
+class Connection(sqlite3.Connection):
+    """sqlite3 connection that reports statements to statement_observers.
+
+    Done in Python rather than with set_trace_callback(): the trace callback
+    also fires for statements SQLite runs internally (bm25() alone runs one
+    per matching row), which made FTS searches about 30% slower.
+    """
+
+    def execute(self, sql, parameters=()):
+        for observer in statement_observers:
+            observer(sql, parameters)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        for observer in statement_observers:
+            observer(sql, None)
+        return super().executemany(sql, seq_of_parameters)
+
+
+def connect(database=DEFAULT_DATABASE, **kwargs):
+    """Open a tuned SQLite connection returning sqlite3.Row objects"""
+    conn = sqlite3.connect(database, factory=Connection, cached_statements=CACHED_STATEMENTS, **kwargs)
+    conn.row_factory = sqlite3.Row
+    for name, value in CONNECTION_PRAGMAS:
+        conn.execute(f'PRAGMA {name} = {value}')
+    for hook in connection_hooks:
+        hook(conn)
+    return conn
+
+
+class ConnectionPool:
+    """Keep one long-lived read connection per worker thread.
+
+    Under gunicorn's gthread workers each long-lived thread reuses its own
+    connection across requests instead of paying the connect/pragma cost
+    every time. The Flask dev server starts a thread per request, so there
+    a connection lasts one request: only the thread holds it, and it is
+    closed when the thread exits. Connections are never shared between
+    threads, and a forked child discards anything inherited from its parent.
+
+    The connections are query_only: writes go through the writer thread
+    (writer.py), and WAL lets these readers run alongside it.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Weak, so a finished thread's connection is closed with it
+        self._connections = weakref.WeakSet()
+        self._pid = os.getpid()
+
+    def acquire(self):
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.database, check_same_thread=False)
+            conn.execute('PRAGMA query_only = 1')
+            self._local.conn = conn
+            with self._lock:
+                self._connections.add(conn)
+        return conn
+
+    def release(self, conn):
+        """Return a connection to its thread, discarding unfinished work"""
+        if conn.in_transaction:
+            conn.rollback()
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = list(self._connections), weakref.WeakSet()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+    def _reset_after_fork(self):
+        # Connections opened before fork() must not be used by the child
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = weakref.WeakSet()
+
+
+def init_app(app):
+    """Attach a read connection pool to the app and release connections on teardown"""
+    app.config.setdefault('DATABASE', os.environ.get('BOOKSTORE_DATABASE', DEFAULT_DATABASE))
+    app.extensions['db_pool'] = ConnectionPool(app.config['DATABASE'])
+    app.teardown_appcontext(close_db)
+
+
+def get_db():
+    """Return the (read-only) connection bound to the current request"""
+    if 'db' not in g:
+        g.db = current_app.extensions['db_pool'].acquire()
+    return g.db
+
+
+def close_db(error=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        current_app.extensions['db_pool'].release(conn)
+
+
+def rollback_db():
+    """Roll back the current request's open transaction, if any"""
+    conn = g.get('db')
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
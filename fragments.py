@@ -0,0 +1,128 @@
+"""Template fragment caching and compiled-template caching.
+
+FragmentCacheExtension adds a {% cache %} tag. The rendered body is stored
+under the tag's arguments plus the catalog version, so any catalog change
+invalidates every fragment at once; anything else the markup depends on
+(stock, search highlights) must be part of the key:
+
+    {% cache 'book-card', book.id, book.stock %}
+        ...card markup...
+    {% endcache %}
+
+Fragments live in a per-process LRU bounded both by entry count
+(FRAGMENT_CACHE_SIZE) and by total characters (FRAGMENT_CACHE_BYTES); set
+FRAGMENT_CACHE_SIZE to 0 to render everything live.
+
+init_app() also gives Jinja a file system bytecode cache, so new workers
+load compiled templates instead of recompiling them, and compiles every
+template at startup so the first requests do not pay for it. Templates are
+only checked for changes on disk when TEMPLATES_AUTO_RELOAD is set or the
+app runs in debug mode.
+"""
+import os
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from cache import LRUCache, catalog_version
+from db import get_db
+
+DEFAULT_MAX_ENTRIES = 20000
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class FragmentCache(LRUCache):
+    """LRUCache of rendered strings that also evicts beyond max_bytes characters"""
+
+    def __init__(self, maxsize=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(maxsize)
+        self.max_bytes = max_bytes
+        self.bytes = 0
+
+    def set(self, key, value):
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous)
+            self._data[key] = value
+            self.bytes += len(value)
+            while self._data and (len(self._data) > self.maxsize or self.bytes > self.max_bytes):
+                _, evicted = self._data.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            value = self._data.pop(key, None)
+            if value is None:
+                return default
+            self.bytes -= len(value)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        stats = super().stats()
+        stats['bytes'] = self.bytes
+        return stats
+
+
+fragment_cache = FragmentCache()
+
+
+def _version():
+    return catalog_version.get(get_db())
+
+
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=fragment_cache, fragment_version=_version)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(args)]), [], [], body).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        cache = self.environment.fragment_cache
+        if not cache.maxsize:
+            return caller()
+        # Undefined values (a missing attribute) all key as None
+        key = (self.environment.fragment_version(),
+               *(None if value is None or isinstance(value, self.environment.undefined) else value
+                 for value in key))
+        rendered = cache.get(key)
+        if rendered is None:
+            rendered = str(caller())
+            cache.set(key, rendered)
+        return Markup(rendered)
+
+
+def precompile(app):
+    """Compile (or load from the bytecode cache) every template now"""
+    env = app.jinja_env
+    for name in env.list_templates(extensions=('html',)):
+        env.get_template(name)
+
+
+def init_app(app):
+    app.config.setdefault('FRAGMENT_CACHE_SIZE', int(os.environ.get('BOOKSTORE_FRAGMENT_CACHE_SIZE', DEFAULT_MAX_ENTRIES)))
+    app.config.setdefault('FRAGMENT_CACHE_BYTES', DEFAULT_MAX_BYTES)
+    app.config.setdefault('TEMPLATE_CACHE_DIR', os.path.join(app.instance_path, 'jinja'))
+
+    fragment_cache.maxsize = app.config['FRAGMENT_CACHE_SIZE']
+    fragment_cache.max_bytes = app.config['FRAGMENT_CACHE_BYTES']
+    app.jinja_env.add_extension(FragmentCacheExtension)
+
+    os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR'])
+    precompile(app)
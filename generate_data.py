@@ -0,0 +1,232 @@
+"""Generate a synthetic bookstore database at realistic scale.
+
+Builds a new database with the full schema (tables plus migrations) and
+fills it with random but reproducible data: the same --seed and --end-date
+always produce the same rows. Every generated user has the password
+'password'; the admin account is admin / admin123 as in init_data.py.
+
+Usage:
+    python generate_data.py --database bench.db --books 100000 --users 20000 \\
+        --orders 200000 --carts 5000 [--genres 20] [--seed 42] [--force]
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import analytics
+import db
+import migrate
+import recommend
+from import_catalog import drop_books_objects, restore_books_objects
+from init_data import create_tables
+from orders import fill_summaries, reserve_pending_stock
+
+BATCH_SIZE = 10000
+
+GENRES = (
+    'Fiction', 'Mystery', 'Science Fiction', 'Fantasy', 'Romance', 'Thriller',
+    'Biography', 'History', 'Science', 'Children', 'Poetry', 'Travel',
+    'Cooking', 'Business', 'Philosophy', 'Religion', 'Art', 'Health',
+    'Self-Help', 'Graphic Novels',
+)
+TITLE_WORDS = (
+    'Shadow', 'River', 'Garden', 'Silent', 'Empire', 'Winter', 'Stone', 'Night',
+    'Glass', 'Crown', 'Secret', 'Ocean', 'Fire', 'Forgotten', 'Last', 'Golden',
+    'Broken', 'Hidden', 'City', 'Light', 'Storm', 'House', 'Road', 'Memory',
+)
+FIRST_NAMES = ('Ada', 'Ben', 'Clara', 'David', 'Elena', 'Farid', 'Grace', 'Hiro',
+               'Iris', 'Jonas', 'Kemi', 'Liam', 'Maya', 'Noor', 'Oscar', 'Priya')
+LAST_NAMES = ('Adams', 'Baker', 'Chen', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Hughes',
+              'Ito', 'Jensen', 'Khan', 'Lopez', 'Moreau', 'Novak', 'Okafor', 'Patel')
+PUBLISHERS = ('Penguin', 'HarperCollins', 'Macmillan', 'Hachette', 'Simon & Schuster',
+              'Scholastic', 'Vintage', 'Bloomsbury')
+DESCRIPTION_WORDS = ('a', 'story', 'of', 'love', 'loss', 'war', 'family', 'journey',
+                     'mystery', 'discovery', 'courage', 'betrayal', 'hope', 'the', 'and')
+ORDER_STATUSES = (('completed', 75), ('pending', 15), ('cancelled', 10))
+
+
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def genre_names(count):
+    names = list(GENRES[:count])
+    names.extend(f'Genre {n}' for n in range(len(names) + 1, count + 1))
+    return names
+
+
+def timestamp(moment):
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def batched(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def insert_many(conn, sql, rows):
+    for batch in batched(rows):
+        conn.execute('BEGIN')
+        conn.executemany(sql, batch)
+        conn.execute('COMMIT')
+
+
+# ==================== GENERATORS ====================
+
+def generate_users(rng, count, start, end):
+    password = hash_password('password')
+    span = int((end - start).total_seconds())
+    yield ('admin', 'admin@bookstore.com', hash_password('admin123'), 1, timestamp(start))
+    for n in range(1, count + 1):
+        joined = start + timedelta(seconds=rng.randrange(span))
+        yield (f'user{n:06d}', f'user{n:06d}@example.com', password, 0, timestamp(joined))
+
+
+def generate_books(rng, count, genres, start, end):
+    span = int((end - start).total_seconds())
+    for n in range(1, count + 1):
+        title = ' '.join(rng.sample(TITLE_WORDS, rng.randint(2, 4)))
+        description = ' '.join(rng.choice(DESCRIPTION_WORDS) for _ in range(rng.randint(8, 30))).capitalize()
+        yield (
+            f'The {title}' if rng.random() < 0.3 else title,
+            f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            description,
+            round(rng.uniform(4.99, 59.99), 2),
+            rng.choice(genres),
+            rng.choice((0, rng.randint(1, 9), rng.randint(10, 250), rng.randint(10, 250))),
+            f'978{n:010d}',
+            rng.choice(PUBLISHERS),
+            rng.randint(80, 1200),
+            int(rng.random() < 0.02),
+            timestamp(start + timedelta(seconds=rng.randrange(span))),
+        )
+
+
+def generate_carts(rng, count, user_count, prices):
+    book_ids = list(prices)
+    for user_id in rng.sample(range(2, user_count + 2), min(count, user_count)):
+        for book_id in rng.sample(book_ids, min(rng.randint(1, 5), len(book_ids))):
+            yield (user_id, book_id, rng.randint(1, 3))
+
+
+def generate_orders(rng, count, user_count, prices, start, end):
+    """Yield (order_row, item_rows) pairs"""
+    book_ids = list(prices)
+    statuses = [status for status, _ in ORDER_STATUSES]
+    weights = [weight for _, weight in ORDER_STATUSES]
+    span = int((end - start).total_seconds())
+    for order_id in range(1, count + 1):
+        items = []
+        for book_id in rng.sample(book_ids, min(rng.randint(1, 4), len(book_ids))):
+            items.append((order_id, book_id, rng.randint(1, 3), prices[book_id]))
+        total = round(sum(quantity * price for _, _, quantity, price in items), 2)
+        created = start + timedelta(seconds=rng.randrange(span))
+        order = (order_id, rng.randint(2, user_count + 1), total,
+                 rng.choices(statuses, weights)[0], rng.choice(('credit_card', 'paypal')),
+                 f'{rng.randint(1, 999)} Main Street', timestamp(created))
+        yield order, items
+
+
+# ==================== BUILD ====================
+
+def generate(database, books, users, orders, carts, genres, seed, end_date, days):
+    rng = random.Random(seed)
+    end = datetime.combine(end_date, datetime.max.time()).replace(microsecond=0)
+    start = end - timedelta(days=days)
+
+    create_tables(database)
+    migrate.upgrade(database)
+    conn = db.connect(database, isolation_level=None)
+    conn.execute('PRAGMA synchronous = OFF')
+    try:
+        started = time.monotonic()
+
+        insert_many(conn, '''
+            INSERT INTO users (username, email, password_hash, is_admin, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', generate_users(rng, users, start, end))
+        print(f"Users:  {users + 1:,}")
+
+        rows = list(generate_books(rng, books, genre_names(genres), start, end))
+        drop_books_objects(conn)
+        try:
+            insert_many(conn, '''
+                INSERT INTO books (id, title, author, description, price, genre, isbn,
+                                   publisher, pages, is_featured, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', ((book_id, *row[:5], *row[6:], row[-1]) for book_id, row in enumerate(rows, 1)))
+            # Stock (row[5]) lives in inventory
+            insert_many(conn, 'INSERT INTO inventory (book_id, on_hand) VALUES (?, ?)',
+                        ((book_id, row[5]) for book_id, row in enumerate(rows, 1)))
+        finally:
+            restore_books_objects(conn)
+        print(f"Books:  {books:,}")
+
+        prices = dict(conn.execute('SELECT id, price FROM books'))
+        insert_many(conn, 'INSERT INTO cart (user_id, book_id, quantity) VALUES (?, ?, ?)',
+                    generate_carts(rng, carts, users, prices))
+        print(f"Carts:  {min(carts, users):,}")
+
+        for batch in batched(generate_orders(rng, orders, users, prices, start, end)):
+            conn.execute('BEGIN')
+            conn.executemany('''
+                INSERT INTO orders (id, user_id, total_amount, status, payment_method,
+                                    shipping_address, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [order for order, _ in batch])
+            conn.executemany('INSERT INTO order_items (order_id, book_id, quantity, price) VALUES (?, ?, ?, ?)',
+                             [item for _, items in batch for item in items])
+            conn.execute('COMMIT')
+        conn.execute('BEGIN')
+        fill_summaries(conn)
+        reserve_pending_stock(conn)
+        conn.execute('COMMIT')
+        print(f"Orders: {orders:,}")
+
+        # Rollups and co-purchase counts are trigger-maintained on status changes only
+        analytics.rebuild(conn, '0000-01-01', '9999-12-31')
+        recommend.rebuild(conn)
+        conn.execute('ANALYZE')
+        print(f"\nGenerated {database} in {time.monotonic() - started:.1f}s")
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic bookstore database')
+    parser.add_argument('--database', default='bench.db')
+    parser.add_argument('--books', type=int, default=10000)
+    parser.add_argument('--genres', type=int, default=len(GENRES))
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--carts', type=int, default=500, help='number of users with a non-empty cart')
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--days', type=int, default=365, help='spread books and orders over this many days')
+    parser.add_argument('--end-date', type=date.fromisoformat, default=date.today(),
+                        help='last day of generated history (YYYY-MM-DD), default: today')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--force', action='store_true', help='overwrite an existing database')
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.database):
+        if not args.force:
+            sys.exit(f"{args.database} already exists (use --force to overwrite)")
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.database + suffix):
+                os.remove(args.database + suffix)
+
+    generate(args.database, max(args.books, 1), max(args.users, 1), max(args.orders, 0),
+             max(args.carts, 0), max(args.genres, 1), args.seed, args.end_date, max(args.days, 1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+"""Production gunicorn settings: gunicorn app:app
+
+The app is preloaded and warmed in the master (see create_app() in app.py)
+and then forked, so workers share templates and catalog caches
+copy-on-write. Each worker runs several threads, each with its own pooled
+SQLite connection.
+"""
+import gc
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = True
+
+
+def when_ready(server):
+    # Keep the warm heap out of the garbage collector's reach so collections
+    # in the workers do not touch (and copy) the shared pages
+    gc.freeze()
@@ -0,0 +1,327 @@
+"""Bulk catalog import from CSV or JSON Lines publisher feeds.
+
+Rows are streamed from each file, validated and upserted by ISBN in chunks,
+one transaction per chunk:
+- a row whose ISBN is already in the catalog updates every listing with that
+  ISBN (some books are listed under several genres, so genre is only used
+  when a book is inserted); optional fields missing from the feed keep their
+  current values;
+- any other row inserts a new book.
+
+While loading, synchronous is OFF and the triggers and secondary indexes on
+books are dropped. They are recreated once at the end, followed by a search
+index rebuild, a dashboard counter refresh and ANALYZE. Their SQL is kept
+in import_dropped_objects until then, so if a load is killed part way the
+next one restores them first. Run large imports
+while the store is quiet: books edited by the app during the load only reach
+the search index at the final rebuild.
+
+Files ending in .gz are decompressed on the fly. Rejected rows are listed in
+the summary and, with --rejects, written to a JSON Lines file.
+
+Usage:
+    python import_catalog.py FILE [FILE ...] [--format csv|jsonl]
+        [--chunk-size 5000] [--rejects rejects.jsonl] [--database bookstore.db]
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+import db
+import migrate
+
+DEFAULT_CHUNK_SIZE = 5000
+PROGRESS_EVERY = 50000
+
+ISBN_PATTERN = re.compile(r'^(\d{9}[\dX]|\d{13})$')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f', ''}
+
+# Index used to find existing books; kept during the load
+ISBN_INDEX = 'idx_books_isbn'
+
+INSERT_SQL = '''
+    INSERT INTO books (title, author, description, price, genre, cover_image,
+                       isbn, publisher, pages, is_featured, is_active, updated_at)
+    VALUES (:title, :author, COALESCE(:description, ''), :price, :genre, :cover_image,
+            :isbn, :publisher, :pages, COALESCE(:is_featured, 0), COALESCE(:is_active, 1),
+            CURRENT_TIMESTAMP)
+'''
+
+UPDATE_SQL = '''
+    UPDATE books SET
+        title = :title,
+        author = :author,
+        price = :price,
+        description = COALESCE(:description, description),
+        cover_image = COALESCE(:cover_image, cover_image),
+        publisher = COALESCE(:publisher, publisher),
+        pages = COALESCE(:pages, pages),
+        is_featured = COALESCE(:is_featured, is_featured),
+        is_active = COALESCE(:is_active, is_active),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE isbn = :isbn
+'''
+
+# Feed stock is the number of copies on hand; books keep their reservations.
+# Runs after the books upsert, so new books get their inventory row here
+# (the insert trigger is dropped during the load).
+INVENTORY_SQL = '''
+    INSERT INTO inventory (book_id, on_hand)
+    SELECT id, COALESCE(:stock, 0) FROM books WHERE isbn = :isbn
+    ON CONFLICT (book_id) DO UPDATE SET
+        on_hand = :stock,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE :stock IS NOT NULL
+'''
+
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.updated = 0
+        self.rejected = 0
+        self.reasons = Counter()
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def rate(self):
+        return self.read / self.elapsed * 60 if self.elapsed else 0.0
+
+
+# ==================== READING AND VALIDATION ====================
+
+def open_text(path):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def detect_format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    return 'jsonl' if name.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_records(path, fmt):
+    """Yield (line_number, record) for every row of a feed, or a ValueError as the record"""
+    with open_text(path) as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_number, ValueError(f'invalid JSON: {e}')
+                    continue
+                if not isinstance(record, dict):
+                    yield line_number, ValueError('not a JSON object')
+                    continue
+                yield line_number, {str(key).strip().lower(): value for key, value in record.items()}
+
+
+def _text(record, name, required=False):
+    value = record.get(name)
+    if value is not None:
+        value = str(value).strip()
+    if not value:
+        if required:
+            raise ValueError(f'missing {name}')
+        return None
+    return value
+
+
+def _number(record, name, convert, required=False):
+    value = _text(record, name, required)
+    if value is None:
+        return None
+    try:
+        number = convert(value)
+    except ValueError:
+        raise ValueError(f'invalid {name}: {value!r}') from None
+    if number < 0:
+        raise ValueError(f'negative {name}: {value!r}')
+    return number
+
+
+def _flag(record, name):
+    value = record.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return int(value)
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return 1
+    if value in FALSE_VALUES:
+        return 0
+    raise ValueError(f'invalid {name}: {value!r}')
+
+
+def validate(record):
+    """Return the normalised book for a feed record; raise ValueError if it is unusable"""
+    isbn = re.sub(r'[\s-]', '', _text(record, 'isbn', required=True)).upper()
+    if not ISBN_PATTERN.match(isbn):
+        raise ValueError(f'invalid isbn: {isbn!r}')
+    return {
+        'isbn': isbn,
+        'title': _text(record, 'title', required=True),
+        'author': _text(record, 'author', required=True),
+        'genre': _text(record, 'genre', required=True),
+        'price': _number(record, 'price', float, required=True),
+        'description': _text(record, 'description'),
+        'stock': _number(record, 'stock', int),
+        'cover_image': _text(record, 'cover_image'),
+        'publisher': _text(record, 'publisher'),
+        'pages': _number(record, 'pages', int),
+        'is_featured': _flag(record, 'is_featured'),
+        'is_active': _flag(record, 'is_active'),
+    }
+
+
+# ==================== LOADING ====================
+
+def drop_books_objects(conn):
+    """Drop triggers and secondary indexes on books, saving their SQL for restore_books_objects()"""
+    if conn.execute('SELECT 1 FROM import_dropped_objects LIMIT 1').fetchone():
+        print("Restoring triggers and indexes left dropped by an interrupted load...")
+        restore_books_objects(conn)
+
+    # Saved in the same transaction as the drop, so a crash cannot lose them
+    conn.execute('BEGIN IMMEDIATE')
+    saved = conn.execute('''
+        SELECT type, name, sql FROM sqlite_master
+        WHERE tbl_name = 'books' AND type IN ('trigger', 'index')
+          AND sql IS NOT NULL AND name != ?
+        ORDER BY type, name
+    ''', (ISBN_INDEX,)).fetchall()
+    conn.executemany('INSERT INTO import_dropped_objects (type, name, sql) VALUES (?, ?, ?)', saved)
+    for object_type, name, _ in saved:
+        conn.execute(f'DROP {object_type.upper()} IF EXISTS "{name}"')
+    conn.execute('COMMIT')
+
+
+def restore_books_objects(conn):
+    """Recreate dropped objects and redo the work their triggers skipped"""
+    conn.execute('BEGIN IMMEDIATE')
+    for (sql,) in conn.execute('SELECT sql FROM import_dropped_objects ORDER BY id').fetchall():
+        conn.execute(sql)
+    conn.execute('DELETE FROM import_dropped_objects')
+    conn.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+    conn.execute('INSERT OR IGNORE INTO inventory (book_id) SELECT id FROM books')
+    conn.execute('UPDATE store_stats SET total_books = (SELECT COUNT(*) FROM books) WHERE id = 1')
+    conn.execute('UPDATE catalog_state SET version = version + 1, stock_version = stock_version + 1 WHERE id = 1')
+    conn.execute('COMMIT')
+
+
+def upsert_chunk(conn, books):
+    """Upsert one chunk in a single transaction; returns (inserted, updated)"""
+    # The last row for an ISBN within a chunk wins
+    books = list({book['isbn']: book for book in books}.values())
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        existing = {row[0] for row in conn.execute(
+            'SELECT DISTINCT isbn FROM books WHERE isbn IN (SELECT value FROM json_each(?))',
+            (json.dumps([book['isbn'] for book in books]),)
+        )}
+        updates = [book for book in books if book['isbn'] in existing]
+        inserts = [book for book in books if book['isbn'] not in existing]
+        conn.executemany(UPDATE_SQL, updates)
+        conn.executemany(INSERT_SQL, inserts)
+        conn.executemany(INVENTORY_SQL, books)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return len(inserts), len(updates)
+
+
+def import_files(conn, paths, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE, rejects=None):
+    stats = ImportStats()
+    drop_books_objects(conn)
+    try:
+        chunk = []
+        for path in paths:
+            for line_number, record in read_records(path, fmt or detect_format(path)):
+                stats.read += 1
+                try:
+                    if isinstance(record, ValueError):
+                        raise record
+                    chunk.append(validate(record))
+                except ValueError as e:
+                    stats.rejected += 1
+                    stats.reasons[str(e).split(':')[0]] += 1
+                    if rejects is not None:
+                        rejects.write(json.dumps({'file': path, 'line': line_number, 'error': str(e),
+                                                  'record': None if isinstance(record, ValueError) else record}) + '\n')
+
+                if len(chunk) >= chunk_size:
+                    inserted, updated = upsert_chunk(conn, chunk)
+                    stats.inserted += inserted
+                    stats.updated += updated
+                    chunk = []
+
+                if stats.read % PROGRESS_EVERY == 0:
+                    print(f"  {stats.read:,} rows read ({stats.rate():,.0f} rows/min)")
+
+        if chunk:
+            inserted, updated = upsert_chunk(conn, chunk)
+            stats.inserted += inserted
+            stats.updated += updated
+    finally:
+        print("Rebuilding indexes and search table...")
+        restore_books_objects(conn)
+
+    conn.execute('ANALYZE')
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import books from CSV or JSON Lines feeds')
+    parser.add_argument('files', nargs='+', help='feed files (.csv, .jsonl, optionally .gz)')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='default: from the file extension')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='rows per transaction')
+    parser.add_argument('--rejects', help='write rejected rows to this JSON Lines file')
+    parser.add_argument('--database', default=os.environ.get('BOOKSTORE_DATABASE', db.DEFAULT_DATABASE))
+    args = parser.parse_args(argv)
+
+    conn = db.connect(args.database, isolation_level=None)
+    rejects = open(args.rejects, 'w', encoding='utf-8') if args.rejects else None
+    try:
+        if migrate.pending_migrations(conn):
+            sys.exit("Pending migrations. Please run 'python migrate.py upgrade' first.")
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute('PRAGMA cache_size = -262144')
+        stats = import_files(conn, args.files, args.format, max(args.chunk_size, 1), rejects)
+    finally:
+        if rejects is not None:
+            rejects.close()
+        conn.close()
+
+    print(f"\nRead {stats.read:,} rows in {stats.elapsed:.1f}s ({stats.rate():,.0f} rows/min)")
+    print(f"  inserted: {stats.inserted:,}")
+    print(f"  updated:  {stats.updated:,}")
+    print(f"  rejected: {stats.rejected:,}")
+    for reason, count in stats.reasons.most_common(10):
+        print(f"    {reason}: {count:,}")
+
+
+if __name__ == '__main__':
+    main()
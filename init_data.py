@@ -1,12 +1,14 @@
 import sqlite3
 import hashlib
 
+import migrate
+
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
-def create_tables():
+def create_tables(database='bookstore.db'):
     """Create all necessary database tables"""
-    conn = sqlite3.connect('bookstore.db')
+    conn = sqlite3.connect(database)
     c = conn.cursor()
     
     # Users table
@@ -91,7 +93,7 @@ def reset_auto_increment():
     c = conn.cursor()
     
     # Reset SQLite sequence for each table
-    tables = ['users', 'books', 'orders', 'order_items', 'cart']
+    tables = ['users', 'books', 'orders', 'order_items', 'cart', 'jobs']
     for table in tables:
         try:
             c.execute(f"DELETE FROM sqlite_sequence WHERE name='{table}'")
@@ -109,11 +111,25 @@ def clear_existing_data():
     
     # Clear all data from tables (in correct order to respect foreign keys)
     c.execute('DELETE FROM cart')
+    c.execute('DELETE FROM order_receipts')
     c.execute('DELETE FROM order_items')
     c.execute('DELETE FROM orders')
+    c.execute('DELETE FROM inventory')
     c.execute('DELETE FROM books')
     c.execute('DELETE FROM users')
     
+    # Sales rollups are derived from orders
+    for table in ('sales_daily', 'sales_daily_genre', 'sales_daily_book'):
+        c.execute(f'DELETE FROM {table}')
+    
+    # Co-purchase counts and neighbor lists are derived from orders too
+    for table in ('book_pairs', 'book_neighbors', 'book_neighbors_stale'):
+        c.execute(f'DELETE FROM {table}')
+    
+    # Queued work refers to the old orders, and its idempotency keys
+    # (order_receipt:<id>) would block the same ids once they are reused
+    c.execute('DELETE FROM jobs')
+    
     conn.commit()
     conn.close()
     print("Cleared all existing data from tables")
@@ -300,11 +316,14 @@ def init_sample_data():
     
     # Insert sample books
     try:
-        c.executemany('''
-            INSERT INTO books 
-            (title, author, description, price, genre, stock, cover_image, isbn, publisher, pages, is_featured)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', sample_books)
+        for book in sample_books:
+            c.execute('''
+                INSERT INTO books 
+                (title, author, description, price, genre, cover_image, isbn, publisher, pages, is_featured)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', book[:5] + book[6:])
+            # Stock lives in inventory (the row is created by a trigger)
+            c.execute('UPDATE inventory SET on_hand = ? WHERE book_id = ?', (book[5], c.lastrowid))
         
         book_count = c.execute('SELECT COUNT(*) FROM books').fetchone()[0]
         print(f"[OK] Successfully added {book_count} books to the database")
@@ -351,8 +370,9 @@ if __name__ == '__main__':
     print("STARTING DATABASE INITIALIZATION...")
     print("="*50)
     
-    # Step 1: Create tables
+    # Step 1: Create tables and bring the schema up to date
     create_tables()
+    migrate.upgrade(verbose=True)
     
     # Step 2: Clear existing data and reset auto-increment
     clear_existing_data()
@@ -0,0 +1,307 @@
+"""Durable background jobs stored in SQLite.
+
+enqueue() adds a row to the jobs table on the caller's connection, so a job
+is committed (or rolled back) together with the change that caused it, e.g.
+an order moving to 'completed'. Worker threads claim runnable jobs with a
+single UPDATE ... RETURNING, run the handler and mark the job done in one
+transaction, so a handler's writes and its completion are never separated.
+Failed jobs are retried with exponential backoff up to max_attempts; jobs
+left 'running' by a crashed worker are reclaimed after LOCK_TIMEOUT.
+
+Handlers must be idempotent: a job can run again if its worker dies after
+the handler's side effects but before the commit. Duplicate enqueues are
+avoided with idempotency keys.
+
+By default the web app runs JOB_WORKERS (env BOOKSTORE_JOB_WORKERS, default
+1) worker threads per process, started on the process's first request. Set
+it to 0 and run workers separately with:
+    python jobs.py work [--workers 2]
+    python jobs.py status
+    python jobs.py retry-failed
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+
+import db
+import recommend
+
+POLL_INTERVAL = 1.0
+LOCK_TIMEOUT = 300
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 600
+DEFAULT_MAX_ATTEMPTS = 5
+LOW_STOCK_THRESHOLD = 5
+RECOMMENDATIONS_DELAY = 60
+
+logger = logging.getLogger('bookstore.jobs')
+
+# kind -> handler(conn, payload)
+HANDLERS = {}
+
+# Set to wake idle workers in this process right after a commit
+_wakeup = threading.Event()
+
+
+def handler(kind):
+    """Register a job handler: def run(conn, payload). It must not commit."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(conn, kind, payload=None, key=None, delay=0, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Queue a job on `conn` without committing; returns False if `key` was already queued"""
+    cursor = conn.execute('''
+        INSERT INTO jobs (kind, payload, idempotency_key, run_at, max_attempts)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (idempotency_key) DO NOTHING
+    ''', (kind, json.dumps(payload or {}), key, time.time() + delay, max_attempts))
+    return cursor.rowcount == 1
+
+
+def schedule_recommendations(conn):
+    """Queue one recommendations refresh per RECOMMENDATIONS_DELAY window, however many orders change"""
+    window = int(time.time() // RECOMMENDATIONS_DELAY)
+    enqueue(conn, 'refresh_recommendations', key=f'refresh_recommendations:{window}',
+            delay=RECOMMENDATIONS_DELAY)
+
+
+def wake():
+    """Tell this process's workers to look for jobs now instead of at the next poll"""
+    _wakeup.set()
+
+
+def backoff(attempts):
+    delay = min(BACKOFF_MAX, BACKOFF_BASE ** attempts)
+    return delay * random.uniform(0.5, 1.0)
+
+
+# ==================== WORKERS ====================
+
+def claim(conn, worker_id):
+    now = time.time()
+    return conn.execute('''
+        UPDATE jobs
+        SET status = 'running', attempts = attempts + 1, locked_at = ?, locked_by = ?
+        WHERE id = (
+            SELECT id FROM jobs
+            WHERE (status = 'queued' AND run_at <= ?)
+               OR (status = 'running' AND locked_at < ?)
+            ORDER BY run_at, id
+            LIMIT 1
+        )
+        RETURNING id, kind, payload, attempts, max_attempts
+    ''', (now, worker_id, now, now - LOCK_TIMEOUT)).fetchone()
+
+
+def run_job(conn, job):
+    func = HANDLERS.get(job['kind'])
+    try:
+        if func is None:
+            raise LookupError(f"No handler for job kind {job['kind']!r}")
+        conn.execute('BEGIN IMMEDIATE')
+        func(conn, json.loads(job['payload']))
+        conn.execute('''
+            UPDATE jobs SET status = 'done', finished_at = CURRENT_TIMESTAMP, last_error = NULL
+            WHERE id = ?
+        ''', (job['id'],))
+        conn.execute('COMMIT')
+        return True
+    except Exception as e:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        error = f'{type(e).__name__}: {e}'
+        if job['attempts'] >= job['max_attempts']:
+            logger.error('job %s (%s) failed permanently: %s', job['id'], job['kind'], error)
+            conn.execute('''
+                UPDATE jobs SET status = 'failed', last_error = ?, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (error, job['id']))
+        else:
+            logger.warning('job %s (%s) attempt %d failed: %s', job['id'], job['kind'], job['attempts'], error)
+            conn.execute('''
+                UPDATE jobs SET status = 'queued', last_error = ?, run_at = ?
+                WHERE id = ?
+            ''', (error, time.time() + backoff(job['attempts']), job['id']))
+        return False
+
+
+def work(database, stop, worker_id):
+    """Process jobs until `stop` is set"""
+    conn = db.connect(database, isolation_level=None)
+    try:
+        while not stop.is_set():
+            try:
+                job = claim(conn, worker_id)
+                if job is None:
+                    _wakeup.wait(POLL_INTERVAL)
+                    _wakeup.clear()
+                    continue
+                run_job(conn, job)
+            except Exception:
+                # e.g. database is locked; a job left running is reclaimed
+                # after LOCK_TIMEOUT, so keep the worker alive and retry
+                logger.exception('job worker %s failed, retrying', worker_id)
+                if conn.in_transaction:
+                    try:
+                        conn.execute('ROLLBACK')
+                    except sqlite3.Error:
+                        pass
+                stop.wait(POLL_INTERVAL)
+    finally:
+        conn.close()
+
+
+class WorkerPool:
+    def __init__(self, database, size):
+        self.database = database
+        self.size = size
+        self.stop = threading.Event()
+        self.threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._pid = os.getpid()
+        prefix = f'{socket.gethostname()}:{self._pid}'
+        for n in range(self.size):
+            thread = threading.Thread(target=work, name=f'job-worker-{n}', daemon=True,
+                                      args=(self.database, self.stop, f'{prefix}:{n}'))
+            thread.start()
+            self.threads.append(thread)
+
+    def ensure_started(self):
+        """Start the threads in this process once; cheap enough to call per request.
+
+        Threads do not survive fork(), so with gunicorn --preload each worker
+        starts its own on its first request rather than the master at import.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self.stop = threading.Event()
+                self.threads = []
+                self.start()
+
+    def shutdown(self, timeout=5):
+        self.stop.set()
+        wake()
+        for thread in self.threads:
+            thread.join(timeout)
+
+
+def init_app(app):
+    app.config.setdefault('JOB_WORKERS', int(os.environ.get('BOOKSTORE_JOB_WORKERS', 1)))
+    if app.config['JOB_WORKERS'] > 0:
+        pool = WorkerPool(app.config['DATABASE'], app.config['JOB_WORKERS'])
+        app.extensions['job_workers'] = pool
+        app.before_request(pool.ensure_started)
+
+
+# ==================== HANDLERS ====================
+
+@handler('order_receipt')
+def order_receipt(conn, payload):
+    """Write the receipt for a completed order (once)"""
+    order = conn.execute('''
+        SELECT o.id, o.total_amount, o.payment_method, o.shipping_address, o.created_at, u.username
+        FROM orders o JOIN users u ON u.id = o.user_id
+        WHERE o.id = ?
+    ''', (payload['order_id'],)).fetchone()
+    if order is None:
+        return
+    items = conn.execute('''
+        SELECT oi.quantity, oi.price, COALESCE(b.title, 'Book #' || oi.book_id) AS title
+        FROM order_items oi LEFT JOIN books b ON b.id = oi.book_id
+        WHERE oi.order_id = ?
+        ORDER BY oi.id
+    ''', (order['id'],)).fetchall()
+
+    lines = [
+        f"BookStore receipt - order #{order['id']}",
+        f"Date: {order['created_at']}",
+        f"Customer: {order['username']}",
+        '',
+    ]
+    lines.extend(f"{item['quantity']} x {item['title']} @ ${item['price']:.2f}" for item in items)
+    lines.extend([
+        '',
+        f"Subtotal: ${order['total_amount']:.2f}",
+        f"Tax: ${order['total_amount'] * 0.1:.2f}",
+        f"Total: ${order['total_amount'] * 1.1:.2f}",
+        f"Paid by: {(order['payment_method'] or '').replace('_', ' ').title()}",
+        f"Ship to: {order['shipping_address']}",
+    ])
+    conn.execute('INSERT OR IGNORE INTO order_receipts (order_id, body) VALUES (?, ?)',
+                 (order['id'], '\n'.join(lines)))
+
+
+@handler('stock_alert')
+def stock_alert(conn, payload):
+    """Log books from an order that are running low"""
+    rows = conn.execute('''
+        SELECT b.id, b.title, i.on_hand - i.reserved AS stock
+        FROM order_items oi
+        JOIN books b ON b.id = oi.book_id
+        JOIN inventory i ON i.book_id = oi.book_id
+        WHERE oi.order_id = ? AND b.is_active = 1 AND i.on_hand - i.reserved <= ?
+    ''', (payload['order_id'], LOW_STOCK_THRESHOLD)).fetchall()
+    for row in rows:
+        logger.warning('low stock: book %s (%s) has %s left', row['id'], row['title'], row['stock'])
+
+
+@handler('refresh_recommendations')
+def refresh_recommendations(conn, payload):
+    """Recompute a batch of flagged recommendation lists, queueing another job while any remain"""
+    if recommend.refresh(conn):
+        enqueue(conn, 'refresh_recommendations')
+
+
+# ==================== COMMAND LINE ====================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bookstore background jobs')
+    parser.add_argument('command', choices=['work', 'status', 'retry-failed'])
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--database', default=os.environ.get('BOOKSTORE_DATABASE', db.DEFAULT_DATABASE))
+    args = parser.parse_args(argv)
+
+    if args.command == 'work':
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(threadName)s %(message)s')
+        pool = WorkerPool(args.database, max(args.workers, 1))
+        pool.start()
+        print(f"Running {pool.size} worker(s); press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pool.shutdown()
+        return
+
+    conn = db.connect(args.database)
+    try:
+        if args.command == 'retry-failed':
+            count = conn.execute('''
+                UPDATE jobs SET status = 'queued', attempts = 0, run_at = ?, finished_at = NULL
+                WHERE status = 'failed'
+            ''', (time.time(),)).rowcount
+            conn.commit()
+            print(f"Requeued {count} failed job(s)")
+        else:
+            for row in conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status ORDER BY status'):
+                print(f"{row[0]:<8} {row[1]}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
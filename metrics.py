@@ -0,0 +1,211 @@
+"""Per-route request and SQL metrics in Prometheus text format.
+
+init_app() times every request with before/after_request hooks and, through
+db.py's statement observers and connection hooks, counts the SQL statements
+each request runs and approximates the time spent inside SQLite: each
+execute() marks the start of a statement and a progress handler, called
+every PROGRESS_INTERVAL virtual machine instructions, marks that it is
+still running. Statements shorter than one interval therefore count as ~0s,
+and the overhead is one Python call per statement plus one per interval.
+
+Histograms are labelled by endpoint, method and status code and kept in
+process memory, so with several gunicorn workers each worker reports its
+own values. render() produces the /admin/metrics page.
+"""
+import bisect
+import threading
+import time
+
+from flask import g, request
+
+import db
+
+PROGRESS_INTERVAL = 1000
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_TIME_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram with one series per label combination"""
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # per-bucket counts (last one is +Inf), then the sum
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), series):
+                cumulative += count
+                le = 'le="+Inf"' if bound == '+Inf' else f'le="{_format_number(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}')
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f'{self.name}_sum{labels} {_format_number(series[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+REQUEST_LABELS = ('endpoint', 'method', 'status')
+
+request_duration = Histogram(
+    'bookstore_http_request_duration_seconds', 'Time to produce a response.',
+    REQUEST_LABELS, LATENCY_BUCKETS)
+request_sql_statements = Histogram(
+    'bookstore_http_request_sql_statements', 'SQL statements executed per request.',
+    REQUEST_LABELS, SQL_COUNT_BUCKETS)
+request_sql_duration = Histogram(
+    'bookstore_http_request_sql_duration_seconds', 'Approximate time spent in SQLite per request.',
+    REQUEST_LABELS, SQL_TIME_BUCKETS)
+
+HISTOGRAMS = (request_duration, request_sql_statements, request_sql_duration)
+
+# Callables receiving (sql, parameters, seconds) as each timed statement
+# finishes, e.g. the slow-query log
+statement_listeners = []
+
+# name -> object with stats() returning hits/misses/size, see register_cache()
+_caches = {}
+_started_at = time.time()
+
+
+def register_cache(name, cache):
+    """Report an LRUCache-like object's stats() as bookstore_cache_* metrics"""
+    _caches[name] = cache
+
+
+# ==================== SQL ACCOUNTING ====================
+
+class _SQLTimer:
+    """SQL statements and time for the request running on this thread"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.started = None
+        self.last_seen = 0.0
+        self.sql = None
+        self.parameters = None
+
+    def finish(self):
+        if self.started is not None:
+            elapsed = self.last_seen - self.started
+            self.seconds += elapsed
+            self.started = None
+            for listener in statement_listeners:
+                listener(self.sql, self.parameters, elapsed)
+
+
+_local = threading.local()
+
+
+def _timer():
+    timer = getattr(_local, 'timer', None)
+    if timer is None:
+        timer = _local.timer = _SQLTimer()
+    return timer
+
+
+def _on_statement(sql, parameters):
+    timer = _timer()
+    timer.finish()
+    timer.statements += 1
+    timer.sql = sql
+    timer.parameters = parameters
+    timer.started = timer.last_seen = time.perf_counter()
+
+
+def _on_progress():
+    _timer().last_seen = time.perf_counter()
+
+
+def _install(conn):
+    conn.set_progress_handler(_on_progress, PROGRESS_INTERVAL)
+
+
+# ==================== REQUEST HOOKS ====================
+
+def _before_request():
+    _timer().reset()
+    g.request_started = time.perf_counter()
+
+
+def _after_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    timer = _timer()
+    timer.finish()
+    labels = (request.endpoint or 'unmatched', request.method, str(response.status_code))
+    request_duration.observe(labels, time.perf_counter() - started)
+    request_sql_statements.observe(labels, timer.statements)
+    request_sql_duration.observe(labels, timer.seconds)
+    return response
+
+
+def init_app(app):
+    db.statement_observers.append(_on_statement)
+    db.connection_hooks.append(_install)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+
+def render():
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+
+    if _caches:
+        stats = {name: cache.stats() for name, cache in sorted(_caches.items())}
+        for metric, key, kind, documentation in (
+            ('bookstore_cache_hits_total', 'hits', 'counter', 'Cache lookups that found an entry.'),
+            ('bookstore_cache_misses_total', 'misses', 'counter', 'Cache lookups that missed.'),
+            ('bookstore_cache_entries', 'size', 'gauge', 'Entries currently cached.'),
+        ):
+            lines.append(f'# HELP {metric} {documentation}')
+            lines.append(f'# TYPE {metric} {kind}')
+            for name, values in stats.items():
+                lines.append(f'{metric}{{cache="{_escape(name)}"}} {values[key]}')
+
+    lines.append('# HELP bookstore_process_start_time_seconds Start time of the process since unix epoch.')
+    lines.append('# TYPE bookstore_process_start_time_seconds gauge')
+    lines.append(f'bookstore_process_start_time_seconds {_format_number(_started_at)}')
+    return '\n'.join(lines) + '\n'
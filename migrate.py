@@ -0,0 +1,124 @@
+"""Versioned schema migrations for the bookstore database.
+
+Migrations live in the migrations/ directory as NNNN_description.sql files
+and are applied in order, each inside its own transaction. Applied versions
+are recorded in the schema_version table so upgrades can run against a live
+database without clearing existing data.
+
+Usage:
+    python migrate.py upgrade [--database bookstore.db]
+    python migrate.py status  [--database bookstore.db]
+"""
+import argparse
+import os
+import re
+import sqlite3
+
+import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d{4})_([a-z0-9_]+)\.sql$')
+
+
+def ensure_version_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+
+
+def available_migrations():
+    """Return (version, name, path) for every migration file, in order"""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return migrations
+
+
+def applied_versions(conn):
+    # Read-only, so it also works on the app's query_only connections
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()
+    if not exists:
+        return set()
+    return {row[0] for row in conn.execute('SELECT version FROM schema_version')}
+
+
+def pending_migrations(conn):
+    applied = applied_versions(conn)
+    return [m for m in available_migrations() if m[0] not in applied]
+
+
+def apply_migration(conn, version, name, path):
+    with open(path, encoding='utf-8') as f:
+        sql = f.read()
+
+    # executescript() commits any open transaction before running, so the
+    # transaction boundaries are part of the script itself.
+    script = (
+        'BEGIN IMMEDIATE;\n'
+        f'{sql}\n;\n'
+        f"INSERT INTO schema_version (version, name) VALUES ({version}, '{name}');\n"
+        'COMMIT;'
+    )
+    try:
+        conn.executescript(script)
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+
+
+def upgrade(database=db.DEFAULT_DATABASE, verbose=False):
+    """Apply all pending migrations and refresh planner statistics"""
+    conn = db.connect(database)
+    try:
+        ensure_version_table(conn)
+        pending = pending_migrations(conn)
+        for version, name, path in pending:
+            if verbose:
+                print(f"Applying migration {version:04d}_{name}")
+            apply_migration(conn, version, name, path)
+
+        if pending:
+            conn.execute('ANALYZE')
+            conn.commit()
+        elif verbose:
+            print("Database schema is up to date")
+        return [version for version, _, _ in pending]
+    finally:
+        conn.close()
+
+
+def status(database=db.DEFAULT_DATABASE):
+    conn = db.connect(database)
+    try:
+        applied = applied_versions(conn)
+        for version, name, _ in available_migrations():
+            state = 'applied' if version in applied else 'pending'
+            print(f"{version:04d}_{name}: {state}")
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bookstore schema migrations')
+    parser.add_argument('command', choices=['upgrade', 'status'])
+    parser.add_argument('--database', default=os.environ.get('BOOKSTORE_DATABASE', db.DEFAULT_DATABASE))
+    args = parser.parse_args(argv)
+
+    if args.command == 'upgrade':
+        upgrade(args.database, verbose=True)
+    else:
+        status(args.database)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+-- Indexes for the storefront, cart, profile and admin order queries.
+
+-- index(): newest books per genre, featured books
+CREATE INDEX IF NOT EXISTS idx_books_genre_active_created
+    ON books (genre, is_active, created_at);
+CREATE INDEX IF NOT EXISTS idx_books_featured_active_created
+    ON books (is_featured, is_active, created_at);
+
+-- books_by_genre(): genre listing ordered by title
+CREATE INDEX IF NOT EXISTS idx_books_genre_active_title
+    ON books (genre, is_active, title);
+
+-- admin_dashboard(): low stock books
+CREATE INDEX IF NOT EXISTS idx_books_active_stock
+    ON books (is_active, stock);
+
+-- cart(), add_to_cart(): one row per (user, book). Merge any duplicates
+-- created before the constraint existed into the oldest row first.
+UPDATE cart
+SET quantity = (
+    SELECT SUM(c2.quantity) FROM cart c2
+    WHERE c2.user_id = cart.user_id AND c2.book_id = cart.book_id
+)
+WHERE id IN (
+    SELECT MIN(id) FROM cart GROUP BY user_id, book_id HAVING COUNT(*) > 1
+);
+DELETE FROM cart
+WHERE id NOT IN (SELECT MIN(id) FROM cart GROUP BY user_id, book_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_cart_user_book
+    ON cart (user_id, book_id);
+
+-- profile(): a user's orders and their items
+CREATE INDEX IF NOT EXISTS idx_orders_user_created
+    ON orders (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_order_items_order_book
+    ON order_items (order_id, book_id, quantity);
+
+-- admin_orders(), admin_dashboard(): orders by status and recency
+CREATE INDEX IF NOT EXISTS idx_orders_status_created
+    ON orders (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_created
+    ON orders (created_at);
@@ -0,0 +1,29 @@
+-- Single-row catalog version used to invalidate in-process catalog caches.
+-- Any change to what the storefront shows about a book bumps the version;
+-- stock-only updates from checkout deliberately do not.
+
+CREATE TABLE IF NOT EXISTS catalog_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO catalog_state (id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS books_catalog_version_insert
+AFTER INSERT ON books
+BEGIN
+    UPDATE catalog_state SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS books_catalog_version_update
+AFTER UPDATE OF title, author, description, price, genre, cover_image,
+                isbn, publisher, pages, is_featured, is_active, created_at
+ON books
+BEGIN
+    UPDATE catalog_state SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS books_catalog_version_delete
+AFTER DELETE ON books
+BEGIN
+    UPDATE catalog_state SET version = version + 1 WHERE id = 1;
+END;
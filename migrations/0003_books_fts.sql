@@ -0,0 +1,35 @@
+-- Full-text index over the catalog for /search, kept in sync by triggers.
+-- External-content table: the text lives in books, FTS5 stores only the index.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+    title, author, description, publisher, isbn, genre,
+    content = 'books',
+    content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS books_fts_insert
+AFTER INSERT ON books
+BEGIN
+    INSERT INTO books_fts (rowid, title, author, description, publisher, isbn, genre)
+    VALUES (new.id, new.title, new.author, new.description, new.publisher, new.isbn, new.genre);
+END;
+
+CREATE TRIGGER IF NOT EXISTS books_fts_delete
+AFTER DELETE ON books
+BEGIN
+    INSERT INTO books_fts (books_fts, rowid, title, author, description, publisher, isbn, genre)
+    VALUES ('delete', old.id, old.title, old.author, old.description, old.publisher, old.isbn, old.genre);
+END;
+
+CREATE TRIGGER IF NOT EXISTS books_fts_update
+AFTER UPDATE OF title, author, description, publisher, isbn, genre ON books
+BEGIN
+    INSERT INTO books_fts (books_fts, rowid, title, author, description, publisher, isbn, genre)
+    VALUES ('delete', old.id, old.title, old.author, old.description, old.publisher, old.isbn, old.genre);
+    INSERT INTO books_fts (rowid, title, author, description, publisher, isbn, genre)
+    VALUES (new.id, new.title, new.author, new.description, new.publisher, new.isbn, new.genre);
+END;
+
+INSERT INTO books_fts (books_fts) VALUES ('rebuild');
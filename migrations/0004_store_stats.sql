@@ -0,0 +1,92 @@
+-- Dashboard counters kept current by triggers, so admin_dashboard() reads a
+-- single row instead of scanning users, books and orders on every load.
+
+CREATE TABLE IF NOT EXISTS store_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_users INTEGER NOT NULL DEFAULT 0,
+    total_books INTEGER NOT NULL DEFAULT 0,
+    total_orders INTEGER NOT NULL DEFAULT 0,
+    total_revenue REAL NOT NULL DEFAULT 0,
+    pending_orders INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR REPLACE INTO store_stats
+    (id, total_users, total_books, total_orders, total_revenue, pending_orders)
+SELECT 1,
+    (SELECT COUNT(*) FROM users WHERE is_admin = 0),
+    (SELECT COUNT(*) FROM books),
+    (SELECT COUNT(*) FROM orders),
+    (SELECT COALESCE(SUM(total_amount), 0) FROM orders WHERE status = 'completed'),
+    (SELECT COUNT(*) FROM orders WHERE status = 'pending');
+
+-- users: only customers are counted
+CREATE TRIGGER IF NOT EXISTS store_stats_users_insert
+AFTER INSERT ON users WHEN new.is_admin = 0
+BEGIN
+    UPDATE store_stats SET total_users = total_users + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS store_stats_users_delete
+AFTER DELETE ON users WHEN old.is_admin = 0
+BEGIN
+    UPDATE store_stats SET total_users = total_users - 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS store_stats_users_update
+AFTER UPDATE OF is_admin ON users
+BEGIN
+    UPDATE store_stats SET total_users = total_users
+        - (CASE WHEN old.is_admin = 0 THEN 1 ELSE 0 END)
+        + (CASE WHEN new.is_admin = 0 THEN 1 ELSE 0 END)
+    WHERE id = 1;
+END;
+
+-- books
+CREATE TRIGGER IF NOT EXISTS store_stats_books_insert
+AFTER INSERT ON books
+BEGIN
+    UPDATE store_stats SET total_books = total_books + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS store_stats_books_delete
+AFTER DELETE ON books
+BEGIN
+    UPDATE store_stats SET total_books = total_books - 1 WHERE id = 1;
+END;
+
+-- orders: counts, pending orders and completed revenue, including status
+-- changes from update_order_status() and complete_payment()
+CREATE TRIGGER IF NOT EXISTS store_stats_orders_insert
+AFTER INSERT ON orders
+BEGIN
+    UPDATE store_stats SET
+        total_orders = total_orders + 1,
+        pending_orders = pending_orders + (CASE WHEN new.status = 'pending' THEN 1 ELSE 0 END),
+        total_revenue = total_revenue
+            + (CASE WHEN new.status = 'completed' THEN COALESCE(new.total_amount, 0) ELSE 0 END)
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS store_stats_orders_delete
+AFTER DELETE ON orders
+BEGIN
+    UPDATE store_stats SET
+        total_orders = total_orders - 1,
+        pending_orders = pending_orders - (CASE WHEN old.status = 'pending' THEN 1 ELSE 0 END),
+        total_revenue = total_revenue
+            - (CASE WHEN old.status = 'completed' THEN COALESCE(old.total_amount, 0) ELSE 0 END)
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS store_stats_orders_update
+AFTER UPDATE OF status, total_amount ON orders
+BEGIN
+    UPDATE store_stats SET
+        pending_orders = pending_orders
+            - (CASE WHEN old.status = 'pending' THEN 1 ELSE 0 END)
+            + (CASE WHEN new.status = 'pending' THEN 1 ELSE 0 END),
+        total_revenue = total_revenue
+            - (CASE WHEN old.status = 'completed' THEN COALESCE(old.total_amount, 0) ELSE 0 END)
+            + (CASE WHEN new.status = 'completed' THEN COALESCE(new.total_amount, 0) ELSE 0 END)
+    WHERE id = 1;
+END;
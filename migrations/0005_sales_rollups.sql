@@ -0,0 +1,152 @@
+-- Daily sales rollups for admin reports. Completed orders are added to the
+-- rollups when they become completed and removed again if they leave that
+-- status, so reports never scan orders or order_items. Orders are bucketed
+-- by the day they were placed. `python analytics.py rebuild` recomputes
+-- the rollups from scratch for backfills.
+
+CREATE TABLE IF NOT EXISTS sales_daily (
+    day TEXT PRIMARY KEY,
+    orders INTEGER NOT NULL DEFAULT 0,
+    units INTEGER NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS sales_daily_genre (
+    day TEXT NOT NULL,
+    genre TEXT NOT NULL,
+    orders INTEGER NOT NULL DEFAULT 0,
+    units INTEGER NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, genre)
+);
+
+CREATE TABLE IF NOT EXISTS sales_daily_book (
+    day TEXT NOT NULL,
+    book_id INTEGER NOT NULL,
+    genre TEXT NOT NULL,
+    orders INTEGER NOT NULL DEFAULT 0,
+    units INTEGER NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, book_id)
+);
+
+-- Backfill from orders completed before the rollups existed
+INSERT OR REPLACE INTO sales_daily (day, orders, units, revenue)
+SELECT date(o.created_at), COUNT(DISTINCT o.id), SUM(oi.quantity), SUM(oi.quantity * oi.price)
+FROM orders o JOIN order_items oi ON oi.order_id = o.id
+WHERE o.status = 'completed'
+GROUP BY date(o.created_at);
+
+INSERT OR REPLACE INTO sales_daily_genre (day, genre, orders, units, revenue)
+SELECT date(o.created_at), b.genre, COUNT(DISTINCT o.id), SUM(oi.quantity), SUM(oi.quantity * oi.price)
+FROM orders o JOIN order_items oi ON oi.order_id = o.id JOIN books b ON b.id = oi.book_id
+WHERE o.status = 'completed'
+GROUP BY date(o.created_at), b.genre;
+
+INSERT OR REPLACE INTO sales_daily_book (day, book_id, genre, orders, units, revenue)
+SELECT date(o.created_at), oi.book_id, b.genre, COUNT(DISTINCT o.id), SUM(oi.quantity), SUM(oi.quantity * oi.price)
+FROM orders o JOIN order_items oi ON oi.order_id = o.id JOIN books b ON b.id = oi.book_id
+WHERE o.status = 'completed'
+GROUP BY date(o.created_at), oi.book_id;
+
+CREATE TRIGGER IF NOT EXISTS sales_rollup_order_completed
+AFTER UPDATE OF status ON orders
+WHEN new.status = 'completed' AND old.status IS NOT 'completed'
+BEGIN
+    INSERT INTO sales_daily (day, orders, units, revenue)
+    SELECT date(new.created_at), 1, COALESCE(SUM(oi.quantity), 0), COALESCE(SUM(oi.quantity * oi.price), 0)
+    FROM order_items oi WHERE oi.order_id = new.id
+    ON CONFLICT (day) DO UPDATE SET
+        orders = orders + excluded.orders,
+        units = units + excluded.units,
+        revenue = revenue + excluded.revenue;
+
+    INSERT INTO sales_daily_genre (day, genre, orders, units, revenue)
+    SELECT date(new.created_at), b.genre, 1, SUM(oi.quantity), SUM(oi.quantity * oi.price)
+    FROM order_items oi JOIN books b ON b.id = oi.book_id
+    WHERE oi.order_id = new.id
+    GROUP BY b.genre
+    ON CONFLICT (day, genre) DO UPDATE SET
+        orders = orders + excluded.orders,
+        units = units + excluded.units,
+        revenue = revenue + excluded.revenue;
+
+    INSERT INTO sales_daily_book (day, book_id, genre, orders, units, revenue)
+    SELECT date(new.created_at), oi.book_id, b.genre, 1, SUM(oi.quantity), SUM(oi.quantity * oi.price)
+    FROM order_items oi JOIN books b ON b.id = oi.book_id
+    WHERE oi.order_id = new.id
+    GROUP BY oi.book_id
+    ON CONFLICT (day, book_id) DO UPDATE SET
+        orders = orders + excluded.orders,
+        units = units + excluded.units,
+        revenue = revenue + excluded.revenue;
+END;
+
+CREATE TRIGGER IF NOT EXISTS sales_rollup_order_uncompleted
+AFTER UPDATE OF status ON orders
+WHEN old.status = 'completed' AND new.status IS NOT 'completed'
+BEGIN
+    INSERT INTO sales_daily (day, orders, units, revenue)
+    SELECT date(old.created_at), -1, -COALESCE(SUM(oi.quantity), 0), -COALESCE(SUM(oi.quantity * oi.price), 0)
+    FROM order_items oi WHERE oi.order_id = old.id
+    ON CONFLICT (day) DO UPDATE SET
+        orders = orders + excluded.orders,
+        units = units + excluded.units,
+        revenue = revenue + excluded.revenue;
+
+    INSERT INTO sales_daily_genre (day, genre, orders, units, revenue)
+    SELECT date(old.created_at), b.genre, -1, -SUM(oi.quantity), -SUM(oi.quantity * oi.price)
+    FROM order_items oi JOIN books b ON b.id = oi.book_id
+    WHERE oi.order_id = old.id
+    GROUP BY b.genre
+    ON CONFLICT (day, genre) DO UPDATE SET
+        orders = orders + excluded.orders,
+        units = units + excluded.units,
+        revenue = revenue + excluded.revenue;
+
+    INSERT INTO sales_daily_book (day, book_id, genre, orders, units, revenue)
+    SELECT date(old.created_at), oi.book_id, b.genre, -1, -SUM(oi.quantity), -SUM(oi.quantity * oi.price)
+    FROM order_items oi JOIN books b ON b.id = oi.book_id
+    WHERE oi.order_id = old.id
+    GROUP BY oi.book_id
+    ON CONFLICT (day, book_id) DO UPDATE SET
+        orders = orders + excluded.orders,
+        units = units + excluded.units,
+        revenue = revenue + excluded.revenue;
+END;
+
+CREATE TRIGGER IF NOT EXISTS sales_rollup_order_deleted
+BEFORE DELETE ON orders
+WHEN old.status = 'completed'
+BEGIN
+    INSERT INTO sales_daily (day, orders, units, revenue)
+    SELECT date(old.created_at), -1, -COALESCE(SUM(oi.quantity), 0), -COALESCE(SUM(oi.quantity * oi.price), 0)
+    FROM order_items oi WHERE oi.order_id = old.id
+    ON CONFLICT (day) DO UPDATE SET
+        orders = orders + excluded.orders,
+        units = units + excluded.units,
+        revenue = revenue + excluded.revenue;
+
+    INSERT INTO sales_daily_genre (day, genre, orders, units, revenue)
+    SELECT date(old.created_at), b.genre, -1, -SUM(oi.quantity), -SUM(oi.quantity * oi.price)
+    FROM order_items oi JOIN books b ON b.id = oi.book_id
+    WHERE oi.order_id = old.id
+    GROUP BY b.genre
+    ON CONFLICT (day, genre) DO UPDATE SET
+        orders = orders + excluded.orders,
+        units = units + excluded.units,
+        revenue = revenue + excluded.revenue;
+
+    INSERT INTO sales_daily_book (day, book_id, genre, orders, units, revenue)
+    SELECT date(old.created_at), oi.book_id, b.genre, -1, -SUM(oi.quantity), -SUM(oi.quantity * oi.price)
+    FROM order_items oi JOIN books b ON b.id = oi.book_id
+    WHERE oi.order_id = old.id
+    GROUP BY oi.book_id
+    ON CONFLICT (day, book_id) DO UPDATE SET
+        orders = orders + excluded.orders,
+        units = units + excluded.units,
+        revenue = revenue + excluded.revenue;
+END;
+
+CREATE INDEX IF NOT EXISTS idx_sales_daily_genre_genre ON sales_daily_genre (genre, day);
+CREATE INDEX IF NOT EXISTS idx_sales_daily_book_book ON sales_daily_book (book_id, day);
@@ -0,0 +1,35 @@
+-- Per-book modification time and a stock version, used as HTTP validators
+-- (ETag / Last-Modified) for the catalog pages.
+
+ALTER TABLE books ADD COLUMN updated_at TIMESTAMP;
+UPDATE books SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP);
+
+CREATE TRIGGER IF NOT EXISTS books_updated_at_insert
+AFTER INSERT ON books WHEN new.updated_at IS NULL
+BEGIN
+    UPDATE books SET updated_at = COALESCE(new.created_at, CURRENT_TIMESTAMP) WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS books_updated_at_update
+AFTER UPDATE OF title, author, description, price, genre, stock, cover_image,
+                isbn, publisher, pages, is_featured, is_active
+ON books WHEN new.updated_at IS old.updated_at
+BEGIN
+    UPDATE books SET updated_at = CURRENT_TIMESTAMP WHERE id = new.id;
+END;
+
+-- Bumped on every stock change, so listings that show stock can be
+-- revalidated without reading the books they contain.
+ALTER TABLE catalog_state ADD COLUMN stock_version INTEGER NOT NULL DEFAULT 0;
+
+CREATE TRIGGER IF NOT EXISTS books_stock_version_update
+AFTER UPDATE OF stock ON books WHEN new.stock IS NOT old.stock
+BEGIN
+    UPDATE catalog_state SET stock_version = stock_version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS books_stock_version_insert
+AFTER INSERT ON books
+BEGIN
+    UPDATE catalog_state SET stock_version = stock_version + 1 WHERE id = 1;
+END;
@@ -0,0 +1,5 @@
+-- ISBN lookups for the bulk catalog importer, which upserts by ISBN.
+-- Not unique: the catalog lists some books under more than one genre, each
+-- listing being its own row with the same ISBN.
+
+CREATE INDEX IF NOT EXISTS idx_books_isbn ON books (isbn);
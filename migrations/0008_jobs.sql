@@ -0,0 +1,28 @@
+-- Durable background job queue (see jobs.py) and the receipts its
+-- order_receipt job writes.
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    -- Enqueueing a key that already exists is a no-op
+    idempotency_key TEXT UNIQUE,
+    status TEXT NOT NULL DEFAULT 'queued',  -- queued, running, done, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_at REAL NOT NULL,                   -- unix time the job may next run
+    locked_at REAL,
+    locked_by TEXT,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Workers claim the oldest runnable job
+CREATE INDEX IF NOT EXISTS idx_jobs_status_run_at ON jobs (status, run_at);
+
+CREATE TABLE IF NOT EXISTS order_receipts (
+    order_id INTEGER PRIMARY KEY REFERENCES orders (id),
+    body TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,93 @@
+-- Co-purchase recommendations (see recommend.py).
+--
+-- book_pairs counts the completed orders containing both books, in both
+-- directions; the diagonal (book_id = other_id) is the number of completed
+-- orders containing the book. Triggers keep it current as orders enter or
+-- leave the 'completed' status and flag the books involved in
+-- book_neighbors_stale, from where a background job recomputes their
+-- top-k lists in book_neighbors.
+
+CREATE TABLE IF NOT EXISTS book_pairs (
+    book_id INTEGER NOT NULL,
+    other_id INTEGER NOT NULL,
+    orders INTEGER NOT NULL,
+    PRIMARY KEY (book_id, other_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS book_neighbors (
+    book_id INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    neighbor_id INTEGER NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (book_id, rank)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS book_neighbors_stale (
+    book_id INTEGER PRIMARY KEY
+);
+
+-- Genre best sellers for books without co-purchase data
+CREATE INDEX IF NOT EXISTS idx_sales_daily_book_genre_day ON sales_daily_book (genre, day);
+
+-- Backfill from orders completed before recommendations existed
+INSERT INTO book_pairs (book_id, other_id, orders)
+SELECT a.book_id, b.book_id, COUNT(DISTINCT a.order_id)
+FROM orders o
+JOIN order_items a ON a.order_id = o.id
+JOIN order_items b ON b.order_id = o.id
+WHERE o.status = 'completed'
+GROUP BY a.book_id, b.book_id;
+
+INSERT OR IGNORE INTO book_neighbors_stale (book_id)
+SELECT DISTINCT book_id FROM book_pairs;
+
+INSERT INTO jobs (kind, payload, run_at)
+VALUES ('refresh_recommendations', '{}', CAST(strftime('%s', 'now') AS REAL));
+
+CREATE TRIGGER IF NOT EXISTS book_pairs_order_completed
+AFTER UPDATE OF status ON orders
+WHEN new.status = 'completed' AND old.status IS NOT 'completed'
+BEGIN
+    INSERT INTO book_pairs (book_id, other_id, orders)
+    SELECT DISTINCT a.book_id, b.book_id, 1
+    FROM order_items a JOIN order_items b ON b.order_id = a.order_id
+    WHERE a.order_id = new.id
+    ON CONFLICT (book_id, other_id) DO UPDATE SET orders = orders + 1;
+
+    INSERT OR IGNORE INTO book_neighbors_stale (book_id)
+    SELECT book_id FROM order_items WHERE order_id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS book_pairs_order_uncompleted
+AFTER UPDATE OF status ON orders
+WHEN old.status = 'completed' AND new.status IS NOT 'completed'
+BEGIN
+    UPDATE book_pairs SET orders = orders - 1
+    WHERE (book_id, other_id) IN (
+        SELECT a.book_id, b.book_id
+        FROM order_items a JOIN order_items b ON b.order_id = a.order_id
+        WHERE a.order_id = old.id
+    );
+    DELETE FROM book_pairs
+    WHERE book_id IN (SELECT book_id FROM order_items WHERE order_id = old.id) AND orders <= 0;
+
+    INSERT OR IGNORE INTO book_neighbors_stale (book_id)
+    SELECT book_id FROM order_items WHERE order_id = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS book_pairs_order_deleted
+BEFORE DELETE ON orders
+WHEN old.status = 'completed'
+BEGIN
+    UPDATE book_pairs SET orders = orders - 1
+    WHERE (book_id, other_id) IN (
+        SELECT a.book_id, b.book_id
+        FROM order_items a JOIN order_items b ON b.order_id = a.order_id
+        WHERE a.order_id = old.id
+    );
+    DELETE FROM book_pairs
+    WHERE book_id IN (SELECT book_id FROM order_items WHERE order_id = old.id) AND orders <= 0;
+
+    INSERT OR IGNORE INTO book_neighbors_stale (book_id)
+    SELECT book_id FROM order_items WHERE order_id = old.id;
+END;
@@ -0,0 +1,23 @@
+-- Order summaries for the order history page.
+--
+-- place_order() stores the number of copies and the titles bought on the
+-- order row itself, so profile() reads one index range of orders instead of
+-- joining every item its user has ever bought. The titles are a snapshot
+-- taken at purchase time and do not follow later catalog edits.
+-- idx_orders_user_created (0001) already covers the (user_id, created_at)
+-- lookup; the rowid it carries breaks ties between orders placed in the
+-- same second.
+
+ALTER TABLE orders ADD COLUMN item_count INTEGER;
+ALTER TABLE orders ADD COLUMN book_titles TEXT;
+
+UPDATE orders SET
+    item_count = (SELECT COALESCE(SUM(quantity), 0) FROM order_items WHERE order_id = orders.id),
+    book_titles = (
+        SELECT GROUP_CONCAT(title, ', ') FROM (
+            SELECT COALESCE(b.title, 'Book #' || oi.book_id) AS title
+            FROM order_items oi LEFT JOIN books b ON b.id = oi.book_id
+            WHERE oi.order_id = orders.id
+            ORDER BY oi.id
+        )
+    );
@@ -0,0 +1,85 @@
+-- Inventory moves out of books into its own narrow table.
+--
+-- Checkout used to rewrite the whole (wide) books row to change stock.
+-- inventory holds one small row per book instead:
+--   on_hand   copies physically in stock
+--   reserved  copies held by pending orders
+-- and the storefront shows on_hand - reserved as available stock.
+-- place_order() reserves copies; the trigger below turns the reservation
+-- into a sale when the order completes and releases it when a pending
+-- order is cancelled. Books rows now only change on catalog edits.
+
+CREATE TABLE IF NOT EXISTS inventory (
+    book_id INTEGER PRIMARY KEY REFERENCES books (id),
+    on_hand INTEGER NOT NULL DEFAULT 0,
+    reserved INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Stock was already taken off books for pending orders: hold it as reserved
+INSERT INTO inventory (book_id, on_hand, reserved, updated_at)
+SELECT b.id, COALESCE(b.stock, 0) + COALESCE(p.quantity, 0), COALESCE(p.quantity, 0),
+       COALESCE(b.updated_at, CURRENT_TIMESTAMP)
+FROM books b
+LEFT JOIN (
+    SELECT oi.book_id, SUM(oi.quantity) AS quantity
+    FROM orders o JOIN order_items oi ON oi.order_id = o.id
+    WHERE o.status = 'pending'
+    GROUP BY oi.book_id
+) p ON p.book_id = b.id;
+
+-- admin_dashboard(), stock_alert: books running low
+CREATE INDEX IF NOT EXISTS idx_inventory_available ON inventory (on_hand - reserved);
+
+CREATE TRIGGER IF NOT EXISTS books_inventory_insert
+AFTER INSERT ON books
+BEGIN
+    INSERT OR IGNORE INTO inventory (book_id) VALUES (new.id);
+END;
+
+-- Reservations follow the order: leaving 'pending' releases them, entering
+-- 'completed' takes the copies off the shelf (and leaving it puts them back)
+CREATE TRIGGER IF NOT EXISTS inventory_order_status
+AFTER UPDATE OF status ON orders
+WHEN new.status IS NOT old.status
+BEGIN
+    UPDATE inventory SET
+        reserved = reserved + items.quantity * ((new.status IS 'pending') - (old.status IS 'pending')),
+        on_hand = on_hand - items.quantity * ((new.status IS 'completed') - (old.status IS 'completed')),
+        updated_at = CURRENT_TIMESTAMP
+    FROM (
+        SELECT book_id, SUM(quantity) AS quantity FROM order_items
+        WHERE order_id = new.id
+        GROUP BY book_id
+    ) AS items
+    WHERE inventory.book_id = items.book_id;
+END;
+
+-- The stock version (0006) now follows available stock
+DROP TRIGGER IF EXISTS books_stock_version_update;
+DROP TRIGGER IF EXISTS books_stock_version_insert;
+
+CREATE TRIGGER IF NOT EXISTS inventory_stock_version_update
+AFTER UPDATE OF on_hand, reserved ON inventory
+WHEN new.on_hand - new.reserved IS NOT old.on_hand - old.reserved
+BEGIN
+    UPDATE catalog_state SET stock_version = stock_version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS inventory_stock_version_insert
+AFTER INSERT ON inventory
+BEGIN
+    UPDATE catalog_state SET stock_version = stock_version + 1 WHERE id = 1;
+END;
+
+DROP TRIGGER IF EXISTS books_updated_at_update;
+CREATE TRIGGER IF NOT EXISTS books_updated_at_update
+AFTER UPDATE OF title, author, description, price, genre, cover_image,
+                isbn, publisher, pages, is_featured, is_active
+ON books WHEN new.updated_at IS old.updated_at
+BEGIN
+    UPDATE books SET updated_at = CURRENT_TIMESTAMP WHERE id = new.id;
+END;
+
+DROP INDEX IF EXISTS idx_books_active_stock;
+ALTER TABLE books DROP COLUMN stock;
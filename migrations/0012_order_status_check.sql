@@ -0,0 +1,20 @@
+-- Order statuses are a closed set.
+--
+-- inventory_order_status (0011) moves stock by comparing the old and new
+-- status against 'pending' and 'completed', so any other value would
+-- release reserved copies or put sold ones back on the shelf. set_status()
+-- rejects unknown statuses; these triggers stop any other write path too.
+
+CREATE TRIGGER IF NOT EXISTS orders_status_check_insert
+BEFORE INSERT ON orders
+WHEN new.status NOT IN ('pending', 'completed', 'cancelled')
+BEGIN
+    SELECT RAISE(ABORT, 'invalid order status');
+END;
+
+CREATE TRIGGER IF NOT EXISTS orders_status_check_update
+BEFORE UPDATE OF status ON orders
+WHEN new.status NOT IN ('pending', 'completed', 'cancelled')
+BEGIN
+    SELECT RAISE(ABORT, 'invalid order status');
+END;
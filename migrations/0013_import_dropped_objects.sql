@@ -0,0 +1,13 @@
+-- Triggers and indexes dropped by a bulk load (import_catalog.py).
+--
+-- drop_books_objects() records their SQL here in the same transaction that
+-- drops them, and restore_books_objects() recreates them and empties the
+-- table. If a load dies in between, the next one finds the rows and
+-- restores the objects before doing anything else.
+
+CREATE TABLE IF NOT EXISTS import_dropped_objects (
+    id INTEGER PRIMARY KEY,
+    type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    sql TEXT NOT NULL
+);
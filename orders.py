@@ -0,0 +1,158 @@
+"""Order placement and status changes.
+
+Both run as writes on the writer thread (writer.py), inside the batch's
+BEGIN IMMEDIATE transaction: the write lock is held before the cart is
+read, copies are reserved in inventory only where enough are available,
+and any shortfall rolls the whole order back. Two buyers racing for the
+last copy therefore can never drive stock negative. Completing or
+cancelling the order settles the reservation (a trigger, see
+migrations/0011_inventory.sql). Follow-up work (low-stock alerts,
+receipts) is queued as jobs in the same transaction.
+
+The order row also stores its item count and book titles, so the order
+history page never has to read order_items.
+"""
+import jobs
+
+
+# Stock accounting (migrations/0011_inventory.sql) only knows these
+STATUSES = ('pending', 'completed', 'cancelled')
+
+
+class OrderError(Exception):
+    """Base class for problems that prevent an order from being placed"""
+
+
+class EmptyCartError(OrderError):
+    pass
+
+
+class OutOfStockError(OrderError):
+    def __init__(self, title):
+        super().__init__(f'Not enough stock for {title}')
+        self.title = title
+
+
+def place_order(conn, user_id, payment_method, shipping_address):
+    """Turn the user's cart into an order and return the new order id; a write, see writer.py.
+
+    Raises EmptyCartError or OutOfStockError, and the writer rolls the
+    partial order back. Call jobs.wake() once the write has returned.
+    """
+    # Prices are read under the write lock so the order total matches
+    # the catalog at the moment of purchase.
+    items = conn.execute('''
+        SELECT c.book_id, c.quantity, b.price, b.title
+        FROM cart c
+        JOIN books b ON c.book_id = b.id
+        WHERE c.user_id = ?
+    ''', (user_id,)).fetchall()
+
+    if not items:
+        raise EmptyCartError('Your cart is empty')
+
+    # Reserve only while enough stock is available; a row that does not
+    # match means another order got there first.
+    for item in items:
+        cursor = conn.execute('''
+            UPDATE inventory SET reserved = reserved + ?, updated_at = CURRENT_TIMESTAMP
+            WHERE book_id = ? AND on_hand - reserved >= ?
+        ''', (item['quantity'], item['book_id'], item['quantity']))
+        if cursor.rowcount != 1:
+            raise OutOfStockError(item['title'])
+
+    total_amount = sum(item['price'] * item['quantity'] for item in items)
+    item_count = sum(item['quantity'] for item in items)
+    book_titles = ', '.join(item['title'] for item in items)
+
+    order_id = conn.execute('''
+        INSERT INTO orders (user_id, total_amount, payment_method, shipping_address,
+                            item_count, book_titles)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (user_id, total_amount, payment_method, shipping_address, item_count, book_titles)).lastrowid
+
+    conn.executemany('''
+        INSERT INTO order_items (order_id, book_id, quantity, price)
+        VALUES (?, ?, ?, ?)
+    ''', [(order_id, item['book_id'], item['quantity'], item['price']) for item in items])
+
+    conn.execute('DELETE FROM cart WHERE user_id = ?', (user_id,))
+    jobs.enqueue(conn, 'stock_alert', {'order_id': order_id}, key=f'stock_alert:{order_id}')
+    return order_id
+
+
+def set_status(conn, order_id, status):
+    """Change an order's status and queue its follow-up jobs; a write, see writer.py
+
+    Reopening or completing a cancelled order needs its copies again, so
+    that raises OutOfStockError unless every item is still available.
+    """
+    if status not in STATUSES:
+        raise OrderError(f'Unknown order status: {status}')
+
+    order = conn.execute('SELECT status FROM orders WHERE id = ?', (order_id,)).fetchone()
+    if order is None:
+        raise OrderError('Order not found')
+
+    if order['status'] == 'cancelled' and status in ('pending', 'completed'):
+        # The write lock is held, so stock cannot change between this check
+        # and the trigger (migrations/0011_inventory.sql) taking the copies
+        short = conn.execute('''
+            SELECT b.title
+            FROM order_items oi
+            JOIN inventory i ON i.book_id = oi.book_id
+            JOIN books b ON b.id = oi.book_id
+            WHERE oi.order_id = ?
+            GROUP BY oi.book_id
+            HAVING MAX(i.on_hand - i.reserved) < SUM(oi.quantity)
+        ''', (order_id,)).fetchone()
+        if short:
+            raise OutOfStockError(short['title'])
+
+    conn.execute('UPDATE orders SET status = ? WHERE id = ?', (status, order_id))
+    # The receipt job is committed with the status change so it cannot be lost
+    if status == 'completed':
+        jobs.enqueue(conn, 'order_receipt', {'order_id': order_id}, key=f'order_receipt:{order_id}')
+    jobs.schedule_recommendations(conn)
+
+
+def pay_order(conn, order_id, user_id):
+    """Mark the user's pending order paid; a write, see writer.py"""
+    order = conn.execute('SELECT status FROM orders WHERE id = ? AND user_id = ?',
+                         (order_id, user_id)).fetchone()
+    if order is None or order['status'] != 'pending':
+        raise OrderError('This order can no longer be paid')
+    set_status(conn, order_id, 'completed')
+
+
+def fill_summaries(conn):
+    """Store item_count and book_titles on orders that were written without them (bulk loads)"""
+    conn.execute('''
+        UPDATE orders SET
+            item_count = (SELECT COALESCE(SUM(quantity), 0) FROM order_items WHERE order_id = orders.id),
+            book_titles = (
+                SELECT GROUP_CONCAT(title, ', ') FROM (
+                    SELECT COALESCE(b.title, 'Book #' || oi.book_id) AS title
+                    FROM order_items oi LEFT JOIN books b ON b.id = oi.book_id
+                    WHERE oi.order_id = orders.id
+                    ORDER BY oi.id
+                )
+            )
+        WHERE item_count IS NULL
+    ''')
+
+
+def reserve_pending_stock(conn):
+    """Hold stock for pending orders written without place_order(); run once after a bulk load"""
+    conn.execute('''
+        UPDATE inventory SET
+            on_hand = on_hand + pending.quantity,
+            reserved = reserved + pending.quantity
+        FROM (
+            SELECT oi.book_id, SUM(oi.quantity) AS quantity
+            FROM orders o JOIN order_items oi ON oi.order_id = o.id
+            WHERE o.status = 'pending'
+            GROUP BY oi.book_id
+        ) AS pending
+        WHERE inventory.book_id = pending.book_id
+    ''')
@@ -0,0 +1,109 @@
+"""Keyset (cursor) pagination helpers.
+
+Pages are addressed by the sort key of the row on either side of them rather
+than by OFFSET, so fetching page 500 costs the same index seek as page 1.
+Cursors are opaque URL-safe tokens encoding that sort key.
+"""
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 96
+
+
+class Page:
+    """One page of rows plus the cursors needed to move either way"""
+
+    __slots__ = ('items', 'next_cursor', 'prev_cursor', 'total', 'per_page')
+
+    def __init__(self, items, next_cursor, prev_cursor, total, per_page):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.per_page = per_page
+
+
+def encode_cursor(values):
+    data = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(token, length):
+    """Return the `length` key values stored in a cursor, or None if it is not valid"""
+    if not token:
+        return None
+    try:
+        data = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(data)
+    except (ValueError, TypeError):
+        return None
+    # Cursors come from the URL: only accept values SQLite can bind
+    if not isinstance(values, list) or len(values) != length:
+        return None
+    if not all(value is None or isinstance(value, (str, int, float)) for value in values):
+        return None
+    return values
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return min(max(value, 1), maximum)
+
+
+def fetch_page(conn, sql, params, keys, after=None, before=None, per_page=DEFAULT_PAGE_SIZE, total=None,
+               descending=False):
+    """Run a keyset-paginated query and return a Page.
+
+    `sql` must contain a `{keyset}` placeholder inside its WHERE clause and
+    end with `ORDER BY {order} LIMIT ?`. `keys` is a list of
+    (sql_expression, column_name) pairs giving a unique sort key, ascending
+    unless `descending` is set; each column_name must be selected so cursors
+    can be built from rows.
+    """
+    expressions = [expression for expression, _ in keys]
+    names = [name for _, name in keys]
+    after_values = decode_cursor(after, len(keys))
+    before_values = decode_cursor(before, len(keys)) if after_values is None else None
+
+    backward = before_values is not None
+    cursor_values = before_values if backward else after_values
+
+    if cursor_values is None:
+        keyset = '1'
+        key_params = []
+    else:
+        columns = ', '.join(expressions)
+        placeholders = ', '.join('?' * len(expressions))
+        keyset = f"({columns}) {'<' if backward != descending else '>'} ({placeholders})"
+        key_params = list(cursor_values)
+
+    direction = 'DESC' if backward != descending else 'ASC'
+    order = ', '.join(f'{expression} {direction}' for expression in expressions)
+
+    rows = conn.execute(
+        sql.format(keyset=keyset, order=order),
+        [*params, *key_params, per_page + 1]
+    ).fetchall()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backward:
+        rows.reverse()
+
+    def cursor_for(row):
+        return encode_cursor(row[name] for name in names)
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if backward:
+            next_cursor = cursor_for(rows[-1])
+            prev_cursor = cursor_for(rows[0]) if has_more else None
+        else:
+            next_cursor = cursor_for(rows[-1]) if has_more else None
+            prev_cursor = cursor_for(rows[0]) if cursor_values is not None else None
+
+    return Page(rows, next_cursor, prev_cursor, total, per_page)
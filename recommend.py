@@ -0,0 +1,162 @@
+"""Co-purchase recommendations for the book page.
+
+Books bought together are scored with item-item cosine similarity over
+completed orders,
+
+    score(a, b) = co(a, b) / sqrt(n(a) * n(b)) * co(a, b) / (co(a, b) + SHRINKAGE)
+
+where co(a, b) counts orders containing both books and n(a) orders
+containing a; the shrinkage term keeps pairs seen once or twice from
+outranking well-established ones. Triggers keep the counts in book_pairs
+current (migrations/0009_recommendations.sql) and flag the books whose
+neighbours changed; the refresh_recommendations job (jobs.py) recomputes
+the top NEIGHBORS per flagged book into book_neighbors, so the book page
+reads its list with a primary-key range scan.
+
+Books without enough co-purchases are topped up with the genre's best
+sellers over the last POPULAR_DAYS days, then with the caller's fallback
+(the newest books in the genre).
+
+Usage:
+    python recommend.py refresh   # recompute the flagged lists now
+    python recommend.py rebuild   # recount every pair from order history
+"""
+import argparse
+import heapq
+import math
+import os
+from collections import defaultdict
+from datetime import date, timedelta
+
+import db
+from cache import LRUCache
+from catalog import catalog_cache
+
+NEIGHBORS = 12
+SHRINKAGE = 2
+REFRESH_BATCH = 500
+POPULAR_DAYS = 90
+POPULAR_LIMIT = 20
+
+# (genre, day) -> best-selling book ids
+popular_cache = LRUCache(maxsize=256)
+
+
+def score(together, orders_a, orders_b):
+    return together / math.sqrt(orders_a * orders_b) * together / (together + SHRINKAGE)
+
+
+def refresh(conn, limit=REFRESH_BATCH):
+    """Recompute neighbour lists for up to `limit` flagged books on the caller's transaction.
+
+    Returns True if flagged books remain.
+    """
+    book_ids = [row[0] for row in conn.execute('SELECT book_id FROM book_neighbors_stale LIMIT ?', (limit,))]
+    if not book_ids:
+        return False
+    placeholders = ', '.join('?' * len(book_ids))
+
+    rows = conn.execute(f'''
+        SELECT p.book_id, p.other_id, p.orders, a.orders AS book_orders, b.orders AS other_orders
+        FROM book_pairs p
+        JOIN book_pairs a ON a.book_id = p.book_id AND a.other_id = p.book_id
+        JOIN book_pairs b ON b.book_id = p.other_id AND b.other_id = p.other_id
+        WHERE p.book_id IN ({placeholders}) AND p.other_id != p.book_id
+    ''', book_ids)
+    candidates = defaultdict(list)
+    for book_id, other_id, together, book_orders, other_orders in rows:
+        candidates[book_id].append((score(together, book_orders, other_orders), together, -other_id))
+
+    neighbors = []
+    for book_id, scored in candidates.items():
+        best = heapq.nlargest(NEIGHBORS, scored)
+        neighbors.extend((book_id, rank, -other, value) for rank, (value, _, other) in enumerate(best, 1))
+
+    conn.execute(f'DELETE FROM book_neighbors WHERE book_id IN ({placeholders})', book_ids)
+    conn.executemany('INSERT INTO book_neighbors (book_id, rank, neighbor_id, score) VALUES (?, ?, ?, ?)',
+                     neighbors)
+    conn.execute(f'DELETE FROM book_neighbors_stale WHERE book_id IN ({placeholders})', book_ids)
+    return conn.execute('SELECT EXISTS (SELECT 1 FROM book_neighbors_stale)').fetchone()[0] == 1
+
+
+def rebuild(conn):
+    """Recount book_pairs from every completed order and recompute all lists"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute('DELETE FROM book_pairs')
+        conn.execute('''
+            INSERT INTO book_pairs (book_id, other_id, orders)
+            SELECT a.book_id, b.book_id, COUNT(DISTINCT a.order_id)
+            FROM orders o
+            JOIN order_items a ON a.order_id = o.id
+            JOIN order_items b ON b.order_id = o.id
+            WHERE o.status = 'completed'
+            GROUP BY a.book_id, b.book_id
+        ''')
+        conn.execute('DELETE FROM book_neighbors')
+        conn.execute('DELETE FROM book_neighbors_stale')
+        conn.execute('INSERT INTO book_neighbors_stale (book_id) SELECT DISTINCT book_id FROM book_pairs')
+        while refresh(conn):
+            pass
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def popular_in_genre(conn, genre):
+    """Best-selling book ids in a genre over the last POPULAR_DAYS days, cached per day"""
+    today = date.today()
+    key = (genre, today.isoformat())
+    book_ids = popular_cache.get(key)
+    if book_ids is None:
+        start = (today - timedelta(days=POPULAR_DAYS)).isoformat()
+        book_ids = [row[0] for row in conn.execute('''
+            SELECT book_id FROM sales_daily_book
+            WHERE genre = ? AND day >= ?
+            GROUP BY book_id
+            ORDER BY SUM(units) DESC, book_id
+            LIMIT ?
+        ''', (genre, start, POPULAR_LIMIT))]
+        popular_cache.set(key, book_ids)
+    return book_ids
+
+
+def related_books(conn, book, fallback=(), limit=4):
+    """Up to `limit` active Books to show next to `book`, best match first"""
+    book_ids = [row[0] for row in conn.execute(
+        'SELECT neighbor_id FROM book_neighbors WHERE book_id = ? ORDER BY rank', (book.id,))]
+    book_ids.extend(popular_in_genre(conn, book.genre))
+    book_ids.extend(row['id'] for row in fallback)
+
+    # A few spare candidates in case some have been deactivated
+    book_ids = [book_id for book_id in dict.fromkeys(book_ids) if book_id != book.id][:limit * 2]
+    books = catalog_cache.get_books(conn, book_ids)
+    related = [books[book_id] for book_id in book_ids if book_id in books and books[book_id].is_active]
+    return related[:limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bookstore co-purchase recommendations')
+    parser.add_argument('command', choices=['refresh', 'rebuild'])
+    parser.add_argument('--database', default=os.environ.get('BOOKSTORE_DATABASE', db.DEFAULT_DATABASE))
+    args = parser.parse_args(argv)
+
+    conn = db.connect(args.database, isolation_level=None)
+    try:
+        if args.command == 'rebuild':
+            rebuild(conn)
+        else:
+            more = True
+            while more:
+                conn.execute('BEGIN IMMEDIATE')
+                more = refresh(conn)
+                conn.execute('COMMIT')
+        count = conn.execute('SELECT COUNT(DISTINCT book_id) FROM book_neighbors').fetchone()[0]
+        print(f"{count} book(s) have recommendations")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import re
+
+from markupsafe import Markup, escape
+
+from cache import cached_count
+from pagination import DEFAULT_PAGE_SIZE, fetch_page
+
+# Highlight markers are control characters so that user-supplied book text
+# can be HTML-escaped before the markers are turned into <mark> tags.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+# bm25() weights, in books_fts column order:
+# title, author, description, publisher, isbn, genre
+COLUMN_WEIGHTS = (10.0, 6.0, 1.0, 2.0, 4.0, 3.0)
+
+TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query matching every word as a prefix"""
+    tokens = TOKEN.findall(text or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_books(conn, text, after=None, before=None, per_page=DEFAULT_PAGE_SIZE):
+    """Return a Page of active books matching `text`, best matches first.
+
+    Each row carries title_highlight and snippet columns with highlight
+    markers; render them with the `highlight` template filter. Without any
+    search terms every active book is listed by title.
+    """
+    match = build_match_query(text)
+    if match is None:
+        total = cached_count(conn, ('search', None), 'SELECT COUNT(*) FROM books WHERE is_active = 1')
+        return fetch_page(conn, '''
+            SELECT b.*, i.on_hand - i.reserved AS stock, NULL AS title_highlight, NULL AS snippet
+            FROM books b JOIN inventory i ON i.book_id = b.id
+            WHERE b.is_active = 1 AND {keyset}
+            ORDER BY {order}
+            LIMIT ?
+        ''', [], [('b.title', 'title'), ('b.id', 'id')], after, before, per_page, total)
+
+    total = cached_count(conn, ('search', match), '''
+        SELECT COUNT(*) FROM books_fts
+        JOIN books b ON b.id = books_fts.rowid
+        WHERE books_fts MATCH ? AND b.is_active = 1
+    ''', (match,))
+
+    rank = f"bm25(books_fts, {', '.join(str(w) for w in COLUMN_WEIGHTS)})"
+    return fetch_page(conn, f'''
+        SELECT b.*,
+               i.on_hand - i.reserved AS stock,
+               {rank} AS rank,
+               highlight(books_fts, 0, ?, ?) AS title_highlight,
+               snippet(books_fts, 2, ?, ?, '...', 24) AS snippet
+        FROM books_fts
+        JOIN books b ON b.id = books_fts.rowid
+        JOIN inventory i ON i.book_id = b.id
+        WHERE books_fts MATCH ? AND b.is_active = 1 AND {{keyset}}
+        ORDER BY {{order}}
+        LIMIT ?
+    ''', [HIGHLIGHT_START, HIGHLIGHT_END, HIGHLIGHT_START, HIGHLIGHT_END, match],
+        [(rank, 'rank'), ('b.id', 'id')], after, before, per_page, total)
+
+
+def render_highlight(text):
+    """Template filter: escape text and turn highlight markers into <mark>"""
+    if not text:
+        return ''
+    html = str(escape(text))
+    return Markup(html.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
@@ -0,0 +1,174 @@
+"""Slow-query log.
+
+Statements timed by metrics.py that take longer than SLOW_QUERY_MS
+(app config, default from the BOOKSTORE_SLOW_QUERY_MS environment variable
+or 100ms; 0 disables the log) are recorded per normalised SQL text and
+endpoint: count, total and worst duration, the shape of the parameters and
+the EXPLAIN QUERY PLAN output, with full scans and temporary sort B-trees
+flagged. /admin/slow-queries lists the entries, worst total time first.
+
+To keep a slow database from making things worse, the plan is captured once
+per entry (refreshed at most every PLAN_TTL seconds), each entry is written
+to the 'bookstore.slowlog' logger at most once per LOG_INTERVAL seconds, and
+only MAX_ENTRIES distinct statements are kept. Entries live in process
+memory, so each gunicorn worker has its own log.
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from flask import has_request_context, request
+
+import metrics
+from cache import LRUCache
+
+DEFAULT_THRESHOLD_MS = 100
+MAX_ENTRIES = 200
+PLAN_TTL = 600
+LOG_INTERVAL = 60
+
+logger = logging.getLogger('bookstore.slowlog')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """Collapse whitespace and replace literals so equivalent statements group together"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _SPACE.sub(' ', sql).strip()
+    return _IN_LIST.sub('(?, ...)', sql)
+
+
+def parameters_shape(parameters):
+    if parameters is None:
+        return 'executemany'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in parameters.items()) + '}'
+    return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+
+
+def plan_flag(detail):
+    """Classify one EXPLAIN QUERY PLAN line: 'full scan', 'index scan', 'temp b-tree' or None"""
+    if detail.startswith('SCAN '):
+        # Subqueries, constant rows and FTS lookups are not table scans
+        if detail.startswith(('SCAN (', 'SCAN CONSTANT ROW')) or 'VIRTUAL TABLE' in detail:
+            return None
+        return 'index scan' if ' USING ' in detail else 'full scan'
+    if 'USE TEMP B-TREE' in detail:
+        return 'temp b-tree'
+    return None
+
+
+def plan_flags(plan):
+    return sorted({flag for flag in map(plan_flag, plan) if flag})
+
+
+class SlowQuery:
+    __slots__ = ('sql', 'endpoint', 'parameters', 'count', 'total', 'worst',
+                 'last_seen', 'plan', 'flags', 'plan_at', 'logged_at', 'suppressed')
+
+    def __init__(self, sql, endpoint, parameters):
+        self.sql = sql
+        self.endpoint = endpoint
+        self.parameters = parameters
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.last_seen = 0.0
+        self.plan = []
+        self.flags = []
+        self.plan_at = 0.0
+        self.logged_at = 0.0
+        self.suppressed = 0
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def plan_rows(self):
+        return [(detail, plan_flag(detail)) for detail in self.plan]
+
+
+class SlowQueryLog:
+    def __init__(self, database=None, threshold_ms=DEFAULT_THRESHOLD_MS):
+        self.database = database
+        self.threshold = threshold_ms / 1000
+        self._entries = LRUCache(MAX_ENTRIES)
+        self._lock = threading.Lock()
+
+    def record(self, sql, parameters, seconds):
+        if not self.threshold or seconds < self.threshold or sql is None:
+            return
+        endpoint = request.endpoint if has_request_context() else None
+        normalized = normalize(sql)
+        key = (normalized, endpoint)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = SlowQuery(normalized, endpoint or '-', parameters_shape(parameters))
+                self._entries.set(key, entry)
+            entry.count += 1
+            entry.total += seconds
+            entry.worst = max(entry.worst, seconds)
+            entry.last_seen = now
+            refresh_plan = now - entry.plan_at >= PLAN_TTL and parameters is not None
+            if refresh_plan:
+                entry.plan_at = now
+            log = now - entry.logged_at >= LOG_INTERVAL
+            if log:
+                entry.logged_at = now
+                suppressed, entry.suppressed = entry.suppressed, 0
+            else:
+                entry.suppressed += 1
+
+        if refresh_plan:
+            entry.plan = self.explain(sql, parameters)
+            entry.flags = plan_flags(entry.plan)
+        if log:
+            logger.warning(
+                'slow query %.1fms endpoint=%s params=%s flags=%s suppressed=%d sql=%s plan=%s',
+                seconds * 1000, entry.endpoint, entry.parameters, ','.join(entry.flags) or '-',
+                suppressed, normalized, ' | '.join(entry.plan),
+            )
+
+    def explain(self, sql, parameters):
+        # A separate plain connection: the statement's own connection is in
+        # the middle of a request and reports to metrics
+        try:
+            conn = sqlite3.connect(self.database)
+            try:
+                rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            return [f'(plan unavailable: {e})']
+        return [row[3] for row in rows]
+
+    def entries(self):
+        """Recorded statements, worst total time first"""
+        with self._lock:
+            entries = [entry for _, entry in self._entries.items()]
+        return sorted(entries, key=lambda entry: entry.total, reverse=True)
+
+    def clear(self):
+        self._entries.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+
+def init_app(app):
+    app.config.setdefault('SLOW_QUERY_MS', float(os.environ.get('BOOKSTORE_SLOW_QUERY_MS', DEFAULT_THRESHOLD_MS)))
+    slow_query_log.database = app.config['DATABASE']
+    slow_query_log.threshold = app.config['SLOW_QUERY_MS'] / 1000
+    metrics.statement_listeners.append(slow_query_log.record)
@@ -96,16 +96,62 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
-    // Cart quantity updates
-    const cartQuantityForms = document.querySelectorAll('form[action*="cart"]');
-    cartQuantityForms.forEach(form => {
-        const quantityInput = form.querySelector('input[name="quantity"]');
-        if (quantityInput) {
-            quantityInput.addEventListener('change', function() {
-                form.submit();
+    // Cart page: change quantities and remove items through the cart API,
+    // then redraw the totals from the summary it returns
+    const cart = document.getElementById('cart');
+    if (cart) {
+        function renderCart(summary) {
+            const lines = {};
+            summary.items.forEach(item => { lines[item.book_id] = item; });
+            cart.querySelectorAll('[data-cart-item]').forEach(card => {
+                const item = lines[card.dataset.cartItem];
+                if (!item) {
+                    card.remove();
+                    return;
+                }
+                card.querySelector('[data-line-total]').textContent = formatPrice(item.line_total);
+                card.querySelector('.cart-quantity').value = item.quantity;
             });
+            cart.querySelector('[data-cart-subtotal]').textContent = formatPrice(summary.subtotal);
+            cart.querySelector('[data-cart-tax]').textContent = formatPrice(summary.tax);
+            cart.querySelector('[data-cart-total]').textContent = formatPrice(summary.total);
+            if (!summary.items.length) {
+                window.location.reload();
+            }
         }
-    });
+
+        function updateCart(url, method, body) {
+            return fetch(url, {
+                method: method,
+                headers: {'Content-Type': 'application/json', 'Accept': 'application/json'},
+                body: body ? JSON.stringify(body) : undefined,
+                credentials: 'same-origin'
+            })
+                .then(response => response.json().then(payload => ({ok: response.ok, payload: payload})))
+                .then(result => {
+                    if (!result.ok) {
+                        showToast(result.payload.error || 'Could not update cart', 'danger');
+                        return fetch(cart.dataset.api, {credentials: 'same-origin'}).then(response => response.json());
+                    }
+                    return result.payload;
+                })
+                .then(result => renderCart(result.data))
+                .catch(() => showToast('Could not update cart', 'danger'));
+        }
+
+        cart.querySelectorAll('.cart-quantity').forEach(input => {
+            input.addEventListener('change', function() {
+                updateCart(this.dataset.url, 'PUT', {quantity: parseInt(this.value) || 0});
+            });
+        });
+
+        cart.querySelectorAll('.cart-remove').forEach(link => {
+            link.addEventListener('click', function(e) {
+                e.preventDefault();
+                updateCart(this.dataset.url, 'DELETE');
+            });
+        });
+    }
 
     // Admin dashboard charts (placeholder)
     if (document.querySelector('.admin-dashboard')) {
@@ -0,0 +1,155 @@
+"""Public storefront: homepage, genre listings, book pages and search.
+
+Pages are served with conditional GET validators (see conditional.py) and
+built from the catalog caches, so a repeat visit is usually a 304 and a
+fresh render reads little more than the rows on the page.
+"""
+from datetime import date
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+
+import recommend
+from auth import public_route
+from cache import LRUCache, cached_count, catalog_version
+from catalog import catalog_cache, stock_levels
+from conditional import conditional
+from db import get_db
+from pagination import DEFAULT_PAGE_SIZE, fetch_page, page_size
+from search import search_books
+
+bp = Blueprint('storefront', __name__)
+
+# Homepage data keyed by catalog version
+homepage_cache = LRUCache(maxsize=2)
+
+
+def homepage_validators():
+    return (catalog_version.get(get_db()),), None
+
+def listing_validators(genre):
+    # Listings show stock, so they also depend on the stock version
+    state = get_db().execute('SELECT version, stock_version FROM catalog_state WHERE id = 1').fetchone()
+    return tuple(state), None
+
+def book_validators(book_id):
+    conn = get_db()
+    row = conn.execute('''
+        SELECT b.updated_at, i.on_hand - i.reserved AS stock,
+               (SELECT group_concat(neighbor_id) FROM book_neighbors WHERE book_id = b.id) AS neighbors
+        FROM books b JOIN inventory i ON i.book_id = b.id
+        WHERE b.id = ? AND b.is_active = 1
+    ''', (book_id,)).fetchone()
+    if row is None:
+        return None
+    # Related books come from the catalog, the book's neighbour list and
+    # genre best sellers (recomputed daily). Stock and neighbours change
+    # without touching books.updated_at, so there is no Last-Modified: the
+    # ETag alone decides.
+    parts = (catalog_version.get(conn), row['updated_at'], row['stock'], row['neighbors'], date.today().isoformat())
+    return parts, None
+
+@bp.route('/')
+@public_route
+@conditional(homepage_validators, max_age=60)
+def index():
+    return render_template('index.html', **homepage(get_db()))
+
+def homepage(conn):
+    """Homepage data for the current catalog version, loaded on a cache miss"""
+    version = catalog_version.get(conn)
+    data = homepage_cache.get(version)
+    if data is None:
+        data = load_homepage(conn)
+        homepage_cache.set(version, data)
+    return data
+
+def load_homepage(conn):
+    """Fetch the newest books of every genre plus the featured books"""
+    rows = conn.execute('''
+        SELECT * FROM (
+            SELECT b.*, ROW_NUMBER() OVER (
+                PARTITION BY genre ORDER BY created_at DESC, id DESC
+            ) AS genre_rank
+            FROM books b
+            WHERE is_active = 1
+        )
+        WHERE genre_rank <= 6
+        ORDER BY genre, genre_rank
+    ''').fetchall()
+    
+    books_by_genre = {}
+    for book in rows:
+        books_by_genre.setdefault(book['genre'], []).append(book)
+    
+    featured_books = conn.execute('''
+        SELECT * FROM books 
+        WHERE is_featured = 1 AND is_active = 1 
+        ORDER BY created_at DESC 
+        LIMIT 8
+    ''').fetchall()
+    
+    return {
+        'books_by_genre': books_by_genre,
+        'featured_books': featured_books,
+        'genres': list(books_by_genre),
+    }
+
+@bp.route('/books/<genre>')
+@public_route
+@conditional(listing_validators)
+def books_by_genre(genre):
+    conn = get_db()
+    per_page = page_size(request.args.get('per_page'))
+    
+    total = cached_count(conn, ('genre', genre),
+                         'SELECT COUNT(*) FROM books WHERE genre = ? AND is_active = 1', (genre,))
+    page = fetch_page(conn, '''
+        SELECT b.*, i.on_hand - i.reserved AS stock
+        FROM books b JOIN inventory i ON i.book_id = b.id
+        WHERE b.genre = ? AND b.is_active = 1 AND {keyset}
+        ORDER BY {order}
+        LIMIT ?
+    ''', [genre], [('b.title', 'title'), ('b.id', 'id')],
+        request.args.get('after'), request.args.get('before'), per_page, total)
+    
+    return render_template('books.html', books=page.items, genre=genre,
+                           pagination=page_links(page, 'storefront.books_by_genre', genre=genre))
+
+@bp.route('/book/<int:book_id>')
+@public_route
+@conditional(book_validators)
+def book_detail(book_id):
+    conn = get_db()
+    book = catalog_cache.get_book(conn, book_id)
+    
+    if not book:
+        flash('Book not found', 'error')
+        return redirect(url_for('storefront.index'))
+    
+    stock = stock_levels(conn, [book_id]).get(book_id, 0)
+    
+    related_books = recommend.related_books(conn, book, homepage(conn)['books_by_genre'].get(book.genre, ()))
+    
+    return render_template('book_detail.html', book=book, stock=stock, related_books=related_books)
+
+@bp.route('/search')
+@public_route
+def search():
+    query = request.args.get('q', '')
+    per_page = page_size(request.args.get('per_page'))
+    conn = get_db()
+    
+    page = search_books(conn, query, request.args.get('after'), request.args.get('before'), per_page)
+    
+    return render_template('books.html', books=page.items, search_query=query,
+                           pagination=page_links(page, 'storefront.search', q=query))
+
+def page_links(page, endpoint, **values):
+    """Build the pagination context books.html expects for a keyset Page"""
+    if page.per_page != DEFAULT_PAGE_SIZE:
+        values['per_page'] = page.per_page
+    return {
+        'total': page.total,
+        'next_url': url_for(endpoint, after=page.next_cursor, **values) if page.next_cursor else None,
+        'prev_url': url_for(endpoint, before=page.prev_cursor, **values) if page.prev_cursor else None,
+    }
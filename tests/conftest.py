@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import init_data
+import migrate
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Path to an empty, fully migrated bookstore database"""
+    # init_data works on bookstore.db in the current directory
+    monkeypatch.chdir(tmp_path)
+    init_data.create_tables()
+    migrate.upgrade(db.DEFAULT_DATABASE)
+    return str(tmp_path / db.DEFAULT_DATABASE)
+
+
+@pytest.fixture
+def conn(database):
+    conn = db.connect(database)
+    yield conn
+    conn.close()
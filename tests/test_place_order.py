@@ -0,0 +1,124 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from orders import OrderError, OutOfStockError, place_order, set_status
+from writer import Writer
+
+STOCK = 50
+BUYERS = 300
+WORKERS = 4
+
+
+@pytest.fixture
+def book_id(conn):
+    book_id = conn.execute('''
+        INSERT INTO books (title, author, price, genre) VALUES ('Last Copies', 'Someone', 9.99, 'Fiction')
+    ''').lastrowid
+    conn.execute('UPDATE inventory SET on_hand = ? WHERE book_id = ?', (STOCK, book_id))
+    # Record every inventory row that ever shows negative available stock,
+    # including states that only exist inside a transaction
+    conn.execute('CREATE TABLE oversold (book_id INTEGER, available INTEGER)')
+    conn.execute('''
+        CREATE TRIGGER inventory_oversold AFTER UPDATE ON inventory
+        WHEN new.on_hand - new.reserved < 0
+        BEGIN
+            INSERT INTO oversold VALUES (new.book_id, new.on_hand - new.reserved);
+        END
+    ''')
+    conn.commit()
+    return book_id
+
+
+def add_buyers(conn, book_id, count):
+    user_ids = []
+    for i in range(count):
+        user_id = conn.execute('INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)',
+                               (f'buyer{i}', f'buyer{i}@example.com', 'x')).lastrowid
+        conn.execute('INSERT INTO cart (user_id, book_id, quantity) VALUES (?, ?, 1)', (user_id, book_id))
+        user_ids.append(user_id)
+    conn.commit()
+    return user_ids
+
+
+def test_concurrent_orders_never_oversell(database, conn, book_id):
+    user_ids = add_buyers(conn, book_id, BUYERS)
+    writer = Writer(database)
+
+    def buy(user_id):
+        try:
+            return writer.write(place_order, user_id, 'card', '1 Test Street')
+        except OutOfStockError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        order_ids = [order_id for order_id in pool.map(buy, user_ids) if order_id is not None]
+
+    assert len(order_ids) == STOCK
+    assert conn.execute('SELECT COUNT(*) FROM orders').fetchone()[0] == STOCK
+    stock = conn.execute('SELECT on_hand, reserved FROM inventory WHERE book_id = ?', (book_id,)).fetchone()
+    assert (stock['on_hand'], stock['reserved']) == (STOCK, STOCK)
+
+    # Settling the reservations leaves the shelf empty, never negative
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        list(pool.map(lambda order_id: writer.write(set_status, order_id, 'completed'), order_ids))
+
+    stock = conn.execute('SELECT on_hand, reserved FROM inventory WHERE book_id = ?', (book_id,)).fetchone()
+    assert (stock['on_hand'], stock['reserved']) == (0, 0)
+    assert conn.execute('SELECT COUNT(*) FROM oversold').fetchone()[0] == 0
+
+
+def test_orders_from_several_writers_never_oversell(database, conn, book_id):
+    user_ids = add_buyers(conn, book_id, BUYERS)
+    # One writer per gunicorn worker, each with its own connection, so the
+    # stock guard is raced across transactions rather than serialised
+    writers = [Writer(database) for _ in range(WORKERS)]
+
+    def buy(user_id):
+        try:
+            return writers[user_id % WORKERS].write(place_order, user_id, 'card', '1 Test Street')
+        except OutOfStockError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        order_ids = [order_id for order_id in pool.map(buy, user_ids) if order_id is not None]
+
+    assert len(order_ids) == STOCK
+    stock = conn.execute('SELECT on_hand, reserved FROM inventory WHERE book_id = ?', (book_id,)).fetchone()
+    assert (stock['on_hand'], stock['reserved']) == (STOCK, STOCK)
+    assert conn.execute('SELECT COUNT(*) FROM oversold').fetchone()[0] == 0
+
+def test_cancelled_order_cannot_reclaim_sold_stock(database, conn, book_id):
+    first, second = add_buyers(conn, book_id, 2)
+    conn.execute('UPDATE cart SET quantity = ?', (STOCK,))
+    conn.commit()
+    writer = Writer(database)
+
+    order_id = writer.write(place_order, first, 'card', '1 Test Street')
+    writer.write(set_status, order_id, 'cancelled')
+    writer.write(set_status, writer.write(place_order, second, 'card', '2 Test Street'), 'completed')
+
+    for status in ('pending', 'completed'):
+        with pytest.raises(OutOfStockError):
+            writer.write(set_status, order_id, status)
+
+    assert conn.execute('SELECT status FROM orders WHERE id = ?', (order_id,)).fetchone()[0] == 'cancelled'
+    stock = conn.execute('SELECT on_hand, reserved FROM inventory WHERE book_id = ?', (book_id,)).fetchone()
+    assert (stock['on_hand'], stock['reserved']) == (0, 0)
+    assert conn.execute('SELECT COUNT(*) FROM oversold').fetchone()[0] == 0
+
+
+def test_unknown_status_leaves_stock_alone(database, conn, book_id):
+    (user_id,) = add_buyers(conn, book_id, 1)
+    conn.execute('UPDATE cart SET quantity = 2')
+    conn.commit()
+    writer = Writer(database)
+
+    order_id = writer.write(place_order, user_id, 'card', '1 Test Street')
+    writer.write(set_status, order_id, 'completed')
+    with pytest.raises(OrderError):
+        writer.write(set_status, order_id, 'shipped')
+
+    assert conn.execute('SELECT status FROM orders WHERE id = ?', (order_id,)).fetchone()[0] == 'completed'
+    stock = conn.execute('SELECT on_hand, reserved FROM inventory WHERE book_id = ?', (book_id,)).fetchone()
+    assert (stock['on_hand'], stock['reserved']) == (STOCK - 2, 0)
@@ -0,0 +1,139 @@
+"""Single writer thread with group commit.
+
+SQLite admits one writer at a time, so instead of every request thread
+taking the write lock and committing on its own, each process hands its
+writes to one writer thread:
+
+    order_id = writer.write(place_order, user_id, payment_method, address)
+
+A write is a function taking the writer's connection plus its arguments.
+The writer takes whatever writes are waiting (up to MAX_BATCH) and runs
+them in one BEGIN IMMEDIATE transaction, each inside its own savepoint: a
+write that raises is rolled back alone and its exception is re-raised in
+the caller, while the rest of the batch commits together. Callers wait on
+a Future until the batch has committed, so a write that returned is
+durable, and a burst of checkouts costs a handful of commits instead of
+one lock handoff and WAL append per order.
+
+Write functions run on the writer thread, outside the request context:
+they must only use the connection they are given and must not BEGIN,
+COMMIT or ROLLBACK. Request threads read through db.get_db(), whose
+connections are opened with PRAGMA query_only, so a write that bypasses
+the writer fails instead of competing for the lock.
+"""
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+from flask import current_app
+
+import db
+
+logger = logging.getLogger('bookstore.writer')
+
+MAX_BATCH = 64
+# Seconds a caller waits for its batch before giving up
+WRITE_TIMEOUT = 30
+
+
+class Writer:
+    """Runs submitted writes on a dedicated thread, a batch per transaction"""
+
+    def __init__(self, database, max_batch=MAX_BATCH):
+        self.database = database
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(conn, *args, **kwargs) and return a Future for its result"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def write(self, fn, *args, **kwargs):
+        """Run fn(conn, *args, **kwargs) on the writer thread and return its result once committed"""
+        return self.submit(fn, *args, **kwargs).result(WRITE_TIMEOUT)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Writes queued in the parent before fork() belong to the parent
+                self._queue = queue.SimpleQueue()
+            elif self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        conn = None
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if conn is None:
+                    conn = db.connect(self.database, isolation_level=None, check_same_thread=False)
+                self._commit(conn, batch)
+            except Exception as e:
+                # The batch could not be committed (disk full, database
+                # locked...) and perhaps not even rolled back: fail its
+                # writes and carry on with a fresh connection
+                logger.exception('write batch of %d failed', len(batch))
+                for future, *_ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except sqlite3.Error:
+                        pass
+                    conn = None
+
+    def _commit(self, conn, batch):
+        outcomes = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for future, fn, args, kwargs in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute('SAVEPOINT write')
+                try:
+                    outcomes.append((future, fn(conn, *args, **kwargs), None))
+                except Exception as e:
+                    conn.execute('ROLLBACK TO write')
+                    outcomes.append((future, None, e))
+                conn.execute('RELEASE write')
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+def init_app(app):
+    app.extensions['db_writer'] = Writer(app.config['DATABASE'])
+
+
+def write(fn, *args, **kwargs):
+    """Run fn(conn, *args, **kwargs) on the app's writer thread and return its result"""
+    return current_app.extensions['db_writer'].write(fn, *args, **kwargs)
+